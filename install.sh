@@ -169,6 +169,14 @@ fi
 
 success "Python environment configured"
 
+info "Provisioning wake word models..."
+if [[ "$PLATFORM" == "darwin" ]]; then
+    (cd "${INSTALL_DIR}" && "${INSTALL_DIR}/.venv/bin/python" -m chocopi.provision)
+else
+    (cd "${INSTALL_DIR}" && sudo -u "${CHOCOPI_USER}" "${INSTALL_DIR}/.venv/bin/python" -m chocopi.provision)
+fi
+success "Wake word models verified"
+
 # ============================================================================
 # Linux: audio and service setup
 # ============================================================================
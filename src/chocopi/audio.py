@@ -1,94 +1,461 @@
 """Audio management for playback and recording"""
+import asyncio
 import os
 import logging
 import numpy as np
-import simpleaudio as sa
-import sounddevice as sd
 import soundfile as sf
-from chocopi.config import CONFIG, SOUNDS_PATH
+import yaml
+from chocopi.backends import create_backend
+from chocopi.config import CONFIG, DATA_PATH, HOSTNAME, SOUNDS_PATH
+from chocopi.dsp import ChannelCombiner, EchoCanceller, GainControl, make_resampler
+from chocopi.mixer import Cue, OutputMixer, PlaybackStream
 
-INT16_MIN = np.iinfo(np.int16).min
-INT16_MAX = np.iinfo(np.int16).max
+CAPTURE_RING_SECONDS = 10  # history kept for capture consumers
+ECHO_RING_SECONDS = 2  # playback history kept as the echo canceller reference
+ECHO_LEAD_MS = 5  # reference is aligned this much early so the filter stays causal
 
 logger = logging.getLogger(__name__)
 
 
+class AudioRingBuffer:
+    """Preallocated int16 ring buffer of capture samples, written in place by the audio callback.
+
+    Samples are mirrored into a buffer twice the capacity so any window of up to
+    `capacity` samples is contiguous and can be handed out as a zero-copy view.
+    Positions are absolute sample counts since the ring was created.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.write_pos = 0
+        self._buffer = np.zeros(2 * capacity, dtype=np.int16)
+
+    def write(self, samples):
+        """Append a block of samples; returns its start position"""
+        n = len(samples)
+        pos = self.write_pos
+        start = pos % self.capacity
+        first = min(n, self.capacity - start)
+        for offset in (0, self.capacity):
+            np.copyto(self._buffer[offset + start:offset + start + first], samples[:first], casting='unsafe')
+            np.copyto(self._buffer[offset:offset + n - first], samples[first:], casting='unsafe')
+        self.write_pos = pos + n
+        return pos
+
+    def read(self, pos, n):
+        """Return a zero-copy view of n samples starting at pos, or None if they were overwritten"""
+        if pos < self.write_pos - self.capacity or pos + n > self.write_pos:
+            return None
+        start = pos % self.capacity
+        return self._buffer[start:start + n]
+
+
+class RateTap:
+    """The capture bus resampled once to a consumer rate and kept in its own ring.
+
+    Every subscriber at that rate shares the tap, so each rate costs one
+    resampler however many consumers use it, and a tap is dropped with its last
+    subscriber. A new tap resamples any pre-roll history in backfill() on the
+    subscribing thread before going live, so the audio callback only ever
+    resamples the blocks it captures.
+    """
+
+    def __init__(self, bus_ring, bus_rate, sample_rate, resampler, start_pos):
+        self.bus_ring = bus_ring
+        self.bus_rate = bus_rate
+        self.sample_rate = sample_rate
+        self.resampler = resampler
+        self.ring = AudioRingBuffer(int(sample_rate * CAPTURE_RING_SECONDS))
+        self.anchor = start_pos  # bus position of tap position 0
+        self.bus_pos = start_pos  # next bus sample to resample
+
+    def backfill(self, until, chunk):
+        """Resample bus history from bus_pos up to until, chunk samples at a time"""
+        while self.bus_pos < until:
+            n = min(chunk, until - self.bus_pos)
+            history = self.bus_ring.read(self.bus_pos, n)
+            if history is not None:
+                self.ring.write(self.resampler.process(history))
+            self.bus_pos += n
+
+    def feed(self, block, pos):
+        """Resample one bus block, first catching up on bus audio written since backfill()"""
+        if pos != self.bus_pos:
+            history = self.bus_ring.read(self.bus_pos, pos - self.bus_pos)
+            if history is not None and len(history):
+                self.ring.write(self.resampler.process(history))
+        self.ring.write(self.resampler.process(block))
+        self.bus_pos = pos + len(block)
+
+    def position(self, bus_pos):
+        """Tap position corresponding to a bus position"""
+        return (bus_pos - self.anchor) * self.sample_rate // self.bus_rate
+
+
+class CaptureSubscription:
+    """A capture bus consumer with its own sample rate and block size.
+
+    Consumers read the bus ring directly at the bus rate, or the shared rate tap
+    for their rate otherwise. The callback runs on the audio thread with
+    (subscription, pos, frames) and must only hand the position off;
+    subscription.read(pos, frames) returns the block as a zero-copy view.
+    """
+
+    def __init__(self, ring, sample_rate, blocksize, callback, start_pos=None):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.ring = ring
+        self.next_pos = ring.write_pos if start_pos is None else start_pos
+
+    def feed(self):
+        """Emit every complete consumer block now in the ring"""
+        while self.ring.write_pos - self.next_pos >= self.blocksize:
+            self.callback(self, self.next_pos, self.blocksize)
+            self.next_pos += self.blocksize
+
+    def read(self, pos, frames):
+        """Return a zero-copy view of a block, or None if it was overwritten"""
+        return self.ring.read(pos, frames)
+
+
+def latency_path():
+    return DATA_PATH / f"latency_{HOSTNAME}.yml"
+
+
+def load_latency():
+    """Round-trip latency measured on this host by chocopi.latency, or None"""
+    path = latency_path()
+    if not path.exists():
+        return None
+    with path.open('r', encoding='utf-8') as file:
+        return yaml.safe_load(file) or None
+
+
+class EchoReference:
+    """Mixer output at the capture rate, read back in step with the mic for echo cancellation.
+
+    The output callback writes every rendered block; the capture callback reads
+    the block that was playing when the mic block was recorded, delay samples
+    behind the newest output. Reads advance by exactly one capture block, so
+    callback jitter doesn't smear the reference; the read position only jumps
+    back in line when the two clocks have drifted apart by more than slack.
+    """
+
+    def __init__(self, sample_rate, output_rate, resampler, slack):
+        self.ring = AudioRingBuffer(int(sample_rate * ECHO_RING_SECONDS))
+        self.resampler = make_resampler(output_rate, sample_rate, resampler) if output_rate != sample_rate else None
+        self.slack = slack
+        self.delay = 0
+        self.read_pos = None
+        self.resyncs = 0
+
+    def write(self, block):
+        self.ring.write(self.resampler.process(block) if self.resampler else block)
+
+    def read(self, frames):
+        """The reference block for the mic block just captured, or None if it isn't available"""
+        expected = self.ring.write_pos - self.delay - frames
+        if self.read_pos is None or abs(self.read_pos - expected) > self.slack:
+            if self.read_pos is not None:
+                self.resyncs += 1
+            self.read_pos = expected
+        block = self.ring.read(self.read_pos, frames)
+        self.read_pos += frames
+        return block
+
+
+def read_chunks(path, blocksize=4096):
+    """Yield a sound file as mono int16 blocks"""
+    for block in sf.blocks(path, blocksize=blocksize, dtype='int16', always_2d=True):
+        yield (block.sum(axis=1, dtype=np.int32) // block.shape[1]).astype(np.int16)
+
+
 class AudioManager:
     """Audio manager that supports simultaneous playback and recording"""
 
     def __init__(self):
+        self.config = CONFIG['audio']
+        self._backend = None
+        self._pacers = [(self._capture_consumed, True)]
+        self.resampler = self.config.get('resampler', 'polyphase')
+        self.sample_rate = None  # resolved when capture starts
+        self._output_rate = None
         self.input_stream = None
-        self.play_obj = None
+        self.output_stream = None
+        self.mixer = None
+        self.capture_ring = None
+        self.gain = None
+        self.taps = ()
+        self.subscriptions = ()
+        self.preroll_pos = None
+        self.sounds = {}
+        self.echo_reference = None
+        self.playback_ring = None  # mixer output history, kept only while a recorder taps it
+        self.echo_cancelling = True  # cleared while measuring latency so the probe isn't cancelled
 
-    def start_recording(self, sample_rate, dtype, blocksize, callback, input_gain=1.0):
-        """Start recording"""
-        # Stop existing stream if present
+    @property
+    def backend(self):
+        """Device backend from audio.backend, created on first use; set it to run on another backend"""
+        if self._backend is None:
+            self.backend = create_backend(self.config)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+        for caught_up, input_only in self._pacers:
+            backend.pace(caught_up, input_only)
+
+    def _capture_consumed(self):
+        """Virtual clocks hold while capture is open with nothing subscribed, so replayed input isn't lost"""
+        return self.input_stream is None or bool(self.subscriptions)
+
+    def pace(self, caught_up, input_only=False):
+        """Register a consumer check that clocked backends wait on before each block, on this and later backends"""
+        self._pacers.append((caught_up, input_only))
+        if self._backend:
+            self._backend.pace(caught_up, input_only)
+
+    def _device_rate(self, setting, kind):
+        """A configured rate in Hz, or the default device's own rate for 'native'"""
+        if setting == 'native':
+            return self.backend.default_rate(kind)
+        return int(setting)
+
+    @property
+    def output_rate(self):
+        if self._output_rate is None:
+            self._output_rate = self._device_rate(self.config.get('output_sample_rate', 'native'), 'output')
+        return self._output_rate
+
+    def start_capture(self):
+        """Open the shared capture stream; it stays open for the life of the process"""
         if self.input_stream:
-            self.input_stream.stop()
-            self.input_stream.close()
+            return
 
-        # Wrap callback to apply input gain if applicable
-        def gain_callback(indata, frames, time, status):
-            if input_gain != 1.0:
-                # Apply gain
-                processed = indata.astype(np.float32) * input_gain
+        self.sample_rate = self._device_rate(self.config.get('sample_rate', 'native'), 'input')
+        blocksize = int(self.sample_rate * self.config['block_duration_ms'] / 1000)
+        self.capture_ring = AudioRingBuffer(int(self.sample_rate * CAPTURE_RING_SECONDS))
+        ring = self.capture_ring
+        self.gain = GainControl(self.config['input_gain'], self.config.get('agc'), max_block=blocksize)
+        gain = self.gain
+        channels = self.config.get('channels', 1)
+        combiner = None
+        if channels > 1:
+            combiner = ChannelCombiner(
+                channels,
+                mode=self.config.get('channel_mode', 'best'),
+                delays=self.config.get('channel_delays'),
+                max_block=blocksize,
+            )
+        aec_config = self.config.get('aec', {})
+        canceller = reference = None
+        if aec_config.get('enabled', False):
+            canceller = EchoCanceller(
+                blocksize, self.sample_rate, tail_ms=aec_config.get('tail_ms', 150), step=aec_config.get('step', 0.3)
+            )
+            reference = EchoReference(self.sample_rate, self.output_rate, self.resampler, slack=2 * blocksize)
+            self.echo_reference = reference
 
-                # Handle clipping
-                if dtype == 'int16':
-                    max_val = np.max(np.abs(processed))
-                    if max_val > INT16_MAX:
-                        logger.debug("🔇 Input clipping detected (max: %.0f)", max_val)
-                    processed = np.clip(processed, INT16_MIN, INT16_MAX).astype(np.int16)
+        def bus_callback(indata, frames, _time, status):
+            if status:
+                logger.warning("⚠️  Audio device status: %s", status)
+            samples = combiner.process(indata) if combiner else indata[:, 0]
+            if canceller and self.echo_cancelling and frames == blocksize and self.output_stream:
+                # Before gain, so AGC changes don't look like a changing echo path
+                echo = reference.read(frames)
+                if echo is not None:
+                    samples = canceller.process(samples, echo)
+            pos = ring.write(gain.process(samples))
+            block = ring.read(pos, frames)
+            for tap in self.taps:
+                try:
+                    tap.feed(block, pos)
+                except Exception as e:
+                    logger.error("❌ Capture resampler error: %s", e)
+            for subscription in self.subscriptions:
+                try:
+                    subscription.feed()
+                except Exception as e:
+                    logger.error("❌ Capture subscriber error: %s", e)
 
-                callback(processed, frames, time, status)
-            else:
-                callback(indata.copy(), frames, time, status)
-
-        self.input_stream = sd.InputStream(
-            samplerate=sample_rate,
-            channels=1,
-            dtype=dtype,
-            blocksize=blocksize,
-            callback=gain_callback
-        )
+        self.input_stream = self.backend.open_input(self.sample_rate, channels, blocksize, bus_callback)
         self.input_stream.start()
+        logger.info("🎙️  Capture stream open at %d Hz, %d channel(s)", self.sample_rate, channels)
+        self._align_echo()
 
-    def stop_recording(self):
-        """Stop recording and clean up"""
+    def stop_capture(self):
+        """Close the shared capture stream"""
         if self.input_stream:
             self.input_stream.stop()
             self.input_stream.close()
             self.input_stream = None
+        self.subscriptions = ()
+        self.taps = ()
+        self.echo_reference = None
+
+    def _align_echo(self):
+        """Set the echo reference delay once both streams are open"""
+        reference = self.echo_reference
+        if not (reference and self.input_stream and self.output_stream):
+            return
+        delay_ms = self.config.get('aec', {}).get('delay_ms', 'auto')
+        if delay_ms == 'auto':
+            measured = load_latency()
+            if measured and measured.get('sample_rate') == self.sample_rate:
+                delay_ms = measured['delay_ms']
+            else:
+                # Device round trip, less a little so the reference leads the echo
+                delay_ms = (self.input_stream.latency + self.output_stream.latency) * 1000
+            delay_ms -= ECHO_LEAD_MS
+        reference.delay = max(0, int(self.sample_rate * delay_ms / 1000))
+        logger.info("🔁 Echo cancellation on, reference delay %.0fms", delay_ms)
+
+    def _tap(self, sample_rate, start_pos):
+        """The shared rate tap for a consumer rate, created and backfilled from start_pos if new"""
+        for tap in self.taps:
+            if tap.sample_rate == sample_rate:
+                return tap
+        blocksize = int(self.sample_rate * self.config['block_duration_ms'] / 1000)
+        resampler = make_resampler(self.sample_rate, sample_rate, self.resampler, max_block=blocksize)
+        tap = RateTap(self.capture_ring, self.sample_rate, sample_rate, resampler, start_pos)
+        tap.backfill(self.capture_ring.write_pos, blocksize)
+        # Swap in a new tuple so the audio thread never sees a half-updated list
+        self.taps = self.taps + (tap,)
+        logger.debug("🎚️  Resampling capture %d -> %d Hz", self.sample_rate, sample_rate)
+        return tap
+
+    def subscribe(self, sample_rate, blocksize, callback, start_pos=None):
+        """Attach a consumer to the capture bus, resampled through a shared tap if its rate differs.
+
+        start_pos replays bus audio from that position before live blocks, capped
+        at audio.preroll_max_ms.
+        """
+        self.start_capture()
+        now = self.capture_ring.write_pos
+        if start_pos is not None:
+            earliest = now - int(self.sample_rate * self.config['preroll_max_ms'] / 1000)
+            start_pos = max(start_pos, earliest)
+        if sample_rate == self.sample_rate:
+            ring = self.capture_ring
+        else:
+            tap = self._tap(sample_rate, now if start_pos is None else start_pos)
+            ring = tap.ring
+            if start_pos is not None:
+                start_pos = max(tap.position(start_pos), ring.write_pos - ring.capacity)
+        subscription = CaptureSubscription(ring, sample_rate, blocksize, callback, start_pos=start_pos)
+        self.subscriptions = self.subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Detach a consumer from the capture bus, dropping its rate tap if nothing else uses it"""
+        self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
+        rings = {s.ring for s in self.subscriptions}
+        self.taps = tuple(tap for tap in self.taps if tap.ring in rings)
 
-    def start_playing(self, data, sample_rate=24000, blocksize=4096):
-        """Play audio file or data (non-blocking)"""
+    def mark_preroll(self, pos):
+        """Remember the bus position where speech after the wake word starts"""
+        self.preroll_pos = pos
+
+    def take_preroll(self):
+        """Return and clear the pre-roll mark for the next session's input"""
+        pos, self.preroll_pos = self.preroll_pos, None
+        return pos
+
+    def load_sounds(self):
+        """Decode every sound in CONFIG['sounds'] once, ready to play at the output rate"""
+        for name in CONFIG['sounds'].values():
+            self._load_sound(name)
+        logger.debug("🔊 Loaded %d sounds at %d Hz", len(self.sounds), self.output_rate)
+
+    def _load_sound(self, name):
+        path = name if name.startswith('/') else os.path.join(SOUNDS_PATH, name)
+        audio, rate = sf.read(path, dtype='int16', always_2d=True)
+        # Down-mix to mono in int32 so the channels can't overflow
+        audio = (audio.sum(axis=1, dtype=np.int32) // audio.shape[1]).astype(np.int16)
+        if rate != self.output_rate:
+            audio = make_resampler(rate, self.output_rate, self.resampler, max_block=len(audio)).process(audio).copy()
+        self.sounds[name] = audio
+        return audio
+
+    def start_output(self):
+        """Open the shared output stream and its mixer; it stays open for the life of the process"""
+        if self.output_stream:
+            return
+
+        blocksize = int(self.output_rate * self.config['block_duration_ms'] / 1000)
+        self.mixer = OutputMixer(self.output_rate, blocksize, self.config.get('mixer', {}))
+        mixer = self.mixer
+
+        def output_callback(outdata, frames, _time, status):
+            if status:
+                logger.warning("⚠️  Audio output status: %s", status)
+            mixer.render(outdata[:, 0])
+            reference = self.echo_reference
+            if reference:
+                reference.write(outdata[:, 0])
+            playback = self.playback_ring
+            if playback:
+                playback.write(outdata[:, 0])
+
+        self.output_stream = self.backend.open_output(self.output_rate, blocksize, output_callback)
+        self.output_stream.start()
+        logger.info("🔈 Output stream open at %d Hz", self.output_rate)
+        self._align_echo()
+
+    def stop_output(self):
+        """Close the shared output stream"""
+        if self.output_stream:
+            self.output_stream.stop()
+            self.output_stream.close()
+            self.output_stream = None
+
+    def open_stream(self, sample_rate, channel='speech'):
+        """Add a streaming source to the mixer; feed it with put() and close() it when done"""
+        self.start_output()
+        capacity = int(self.output_rate * self.config.get('output_buffer_ms', 200) / 1000)
+        resampler = make_resampler(sample_rate, self.output_rate, self.resampler) if sample_rate != self.output_rate else None
+        return self.mixer.add(PlaybackStream(capacity, sample_rate, self.output_rate, channel=channel, resampler=resampler))
+
+    def play_stream(self, chunks, sample_rate, channel='speech'):
+        """Start streaming an iterator or async iterator of PCM chunks (must be called from the event loop).
+
+        Returns the PlaybackStream, whose position, buffered and underruns report
+        progress; await stream.wait() to block until it has played out.
+        """
+        stream = self.open_stream(sample_rate, channel=channel)
+        stream.task = asyncio.create_task(stream.feed(chunks))
+        return stream
+
+    def play_file(self, path, channel='cue', blocksize=4096):
+        """Stream a sound file from disk without loading it into memory"""
+        path = path if path.startswith('/') else os.path.join(SOUNDS_PATH, path)
+        return self.play_stream(read_chunks(path, blocksize), sf.info(path).samplerate, channel=channel)
+
+    def start_playing(self, data, sample_rate=None):
+        """Play a cached sound by name, or audio data, over anything already playing (non-blocking)"""
         try:
-            self.stop_playing()
+            self.start_output()
             if isinstance(data, str):
-                # Play audio file directly
-                path = data if data.startswith('/') else os.path.join(SOUNDS_PATH, data)
-                wave_obj = sa.WaveObject.from_wave_file(path)
-                self.play_obj = wave_obj.play()
+                audio_np = self.sounds.get(data)
+                if audio_np is None:
+                    audio_np = self._load_sound(data)
             else:
                 # Play numpy array (from bytes or direct array)
                 audio_np = np.frombuffer(data, dtype=np.int16) if isinstance(data, bytes) else data
-                self.play_obj = sa.play_buffer(
-                    audio_np,
-                    num_channels=1,
-                    bytes_per_sample=2,
-                    sample_rate=int(sample_rate)
-                )
+                sample_rate = int(sample_rate or self.output_rate)
+                if sample_rate != self.output_rate:
+                    resampler = make_resampler(sample_rate, self.output_rate, self.resampler, max_block=len(audio_np))
+                    audio_np = resampler.process(audio_np).copy()
+            self.mixer.add(Cue(audio_np))
         except Exception as e:
             logger.error("❌ Audio playback error: %s", e)
 
     def stop_playing(self):
-        """Stops playback if active"""
-        try:
-            if self.play_obj and self.play_obj.is_playing():
-                self.play_obj.stop()
-            self.play_obj = None
-        except Exception as e:
-            logger.warning("⚠️  Error stopping playback: %s", e)
+        """Stops any cues still playing"""
+        if self.mixer:
+            self.mixer.stop('cue')
 
 
 # Global audio manager instance
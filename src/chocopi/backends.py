@@ -0,0 +1,292 @@
+"""Audio device backends for AudioManager: real devices or a virtual clock"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from chocopi.dsp import make_resampler
+
+logger = logging.getLogger(__name__)
+
+PACE_POLL_S = 0.0005  # how often the virtual clock re-checks a consumer that hasn't caught up
+PACE_WARN_S = 5  # warn when a consumer has held the virtual clock this long
+
+
+class AudioBackend(ABC):
+    """Opens the capture and output streams AudioManager runs its callbacks on.
+
+    Streams have start(), stop(), close() and a latency in seconds; callbacks
+    use the sounddevice signature: callback(data, frames, time, status) with
+    int16 (frames, channels) arrays.
+    """
+
+    @abstractmethod
+    def default_rate(self, kind):
+        """The device's own sample rate for 'input' or 'output'"""
+
+    @abstractmethod
+    def open_input(self, sample_rate, channels, blocksize, callback):
+        """A capture stream calling callback with each recorded block"""
+
+    @abstractmethod
+    def open_output(self, sample_rate, blocksize, callback):
+        """A playback stream calling callback to fill each block"""
+
+    def pace(self, caught_up, input_only=False):
+        """Register a consumer check; clocked backends wait for caught_up() before each block.
+
+        input_only checks only hold capture blocks, for consumers of the capture bus.
+        """
+
+
+class SoundDeviceBackend(AudioBackend):
+    """Real devices through PortAudio"""
+
+    def __init__(self):
+        import sounddevice
+        self.sd = sounddevice
+
+    def default_rate(self, kind):
+        return int(self.sd.query_devices(kind=kind)['default_samplerate'])
+
+    def open_input(self, sample_rate, channels, blocksize, callback):
+        return self.sd.InputStream(
+            samplerate=sample_rate, channels=channels, dtype='int16', blocksize=blocksize, callback=callback
+        )
+
+    def open_output(self, sample_rate, blocksize, callback):
+        return self.sd.OutputStream(
+            samplerate=sample_rate, channels=1, dtype='int16', blocksize=blocksize, callback=callback
+        )
+
+
+def wav_source(paths, sample_rate, gap_s=1.0, loop=False, blocksize=4096):
+    """Yield WAV files as mono int16 blocks at sample_rate, with silence between them"""
+    import soundfile as sf
+    gap = np.zeros(int(sample_rate * gap_s), dtype=np.int16)
+    while True:
+        for path in paths:
+            rate = sf.info(str(path)).samplerate
+            resampler = make_resampler(rate, sample_rate, max_block=blocksize) if rate != sample_rate else None
+            for block in sf.blocks(str(path), blocksize=blocksize, dtype='int16', always_2d=True):
+                mono = (block.sum(axis=1, dtype=np.int32) // block.shape[1]).astype(np.int16)
+                yield resampler.process(mono).copy() if resampler else mono
+            logger.debug("📼 Virtual input finished %s", path)
+            yield gap
+        if not loop:
+            return
+
+
+class _VirtualStream:
+    """A stream ticked by its backend's clock, one block per period"""
+
+    latency = 0.0
+
+    def __init__(self, backend, sample_rate, blocksize, callback):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.period = blocksize / sample_rate
+        self.next_time = 0.0  # virtual time of the next block
+        self.frames = 0
+
+    def start(self):
+        self.backend._attach(self)
+
+    def stop(self):
+        self.backend._detach(self)
+
+    def close(self):
+        pass
+
+    def tick(self):
+        try:
+            self._tick()
+        except Exception as e:
+            logger.error("❌ Virtual audio callback error: %s", e)
+        self.frames += self.blocksize
+        self.next_time += self.period
+
+
+class _VirtualInput(_VirtualStream):
+    def __init__(self, backend, sample_rate, channels, blocksize, callback, source):
+        super().__init__(backend, sample_rate, blocksize, callback)
+        self._source = iter(source) if source is not None else iter(())
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._block = np.zeros((blocksize, channels), dtype=np.int16)
+        self.exhausted = threading.Event()
+
+    def _tick(self):
+        filled = 0
+        while filled < self.blocksize:
+            if not len(self._pending):
+                chunk = next(self._source, None)
+                if chunk is None:
+                    self.exhausted.set()
+                    break
+                self._pending = np.asarray(chunk, dtype=np.int16).reshape(-1)
+                continue
+            n = min(self.blocksize - filled, len(self._pending))
+            self._block[filled:filled + n] = self._pending[:n, None]
+            self._pending = self._pending[n:]
+            filled += n
+        self._block[filled:] = 0  # silence once the source runs dry
+        self.callback(self._block, self.blocksize, None, None)
+
+
+class _VirtualOutput(_VirtualStream):
+    def __init__(self, backend, sample_rate, blocksize, callback, sink):
+        super().__init__(backend, sample_rate, blocksize, callback)
+        self._block = np.zeros((blocksize, 1), dtype=np.int16)
+        self._file = None
+        if sink:
+            import soundfile as sf
+            self._file = sf.SoundFile(str(sink), mode='w', samplerate=sample_rate, channels=1, subtype='PCM_16')
+
+    def _tick(self):
+        self.callback(self._block, self.blocksize, None, None)
+        if self._file:
+            self._file.write(self._block)
+        elif self.backend.keep_output:
+            self.backend.output.append(self._block[:, 0].copy())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class VirtualBackend(AudioBackend):
+    """Headless devices: input from WAV files or any iterable of int16 blocks, output to memory or a file.
+
+    One clock thread steps every open stream in virtual time, always ticking the
+    stream whose next block is due first, so capture and playback stay in step
+    and runs are repeatable. A stream only ticks once every check registered
+    with pace() for it reports its consumer has caught up, so slow consumers
+    slow the clock down rather than dropping audio. While capture is held by an
+    input_only check, playback keeps running on its own. speed scales the clock
+    against wall time: 1.0 is real time, 4.0 runs four times faster, and 0 runs
+    as fast as the consumers allow. Output is written to a WAV file, or kept in
+    memory (see output_audio()) when keep_output is set. input_exhausted is set
+    once the input source runs dry, after which the input plays silence.
+    """
+
+    def __init__(self, input_source=None, sample_rate=48000, speed=1.0, output_path=None, keep_output=True):
+        self.input_source = input_source
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.output_path = output_path
+        self.keep_output = keep_output
+        self.output = []
+        self.input_exhausted = threading.Event()
+        self.clock = 0.0  # seconds of virtual time
+        self._pacers = ()  # (caught_up, input_only)
+        self._streams = ()
+        self._lock = threading.Lock()
+        self._tick_lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config, sample_rate):
+        source = None
+        if config.get('input'):
+            source = wav_source(config['input'], sample_rate, gap_s=config.get('gap_s', 1.0), loop=config.get('loop', False))
+        return cls(
+            source, sample_rate=sample_rate, speed=config.get('speed', 1.0),
+            output_path=config.get('output'), keep_output=config.get('keep_output', False),
+        )
+
+    def default_rate(self, kind):
+        return self.sample_rate
+
+    def open_input(self, sample_rate, channels, blocksize, callback):
+        stream = _VirtualInput(self, sample_rate, channels, blocksize, callback, self.input_source)
+        self.input_exhausted = stream.exhausted
+        return stream
+
+    def open_output(self, sample_rate, blocksize, callback):
+        return _VirtualOutput(self, sample_rate, blocksize, callback, self.output_path)
+
+    def pace(self, caught_up, input_only=False):
+        self._pacers = self._pacers + ((caught_up, input_only),)
+
+    def output_audio(self):
+        """Everything played so far, as one int16 array"""
+        return np.concatenate(self.output) if self.output else np.zeros(0, dtype=np.int16)
+
+    def _attach(self, stream):
+        with self._lock:
+            stream.next_time = self.clock
+            self._streams = self._streams + (stream,)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="virtual-audio", daemon=True)
+                self._thread.start()
+
+    def _detach(self, stream):
+        with self._lock:
+            self._streams = tuple(s for s in self._streams if s is not stream)
+        if threading.current_thread() is not self._thread:
+            with self._tick_lock:  # let a block in progress finish before the caller closes the stream
+                pass
+
+    def _run(self):
+        origin = time.monotonic() - (self.clock / self.speed if self.speed else 0.0)
+        while True:
+            with self._lock:
+                if not self._streams:
+                    self._thread = None
+                    return
+                streams = self._streams
+            stream = self._next_ready(streams)
+            if stream is None:
+                continue
+            if self.speed:
+                delay = origin + stream.next_time / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self._tick_lock:
+                if stream in self._streams:
+                    self.clock = max(self.clock, stream.next_time)
+                    stream.tick()
+
+    def _ready(self, stream):
+        is_input = isinstance(stream, _VirtualInput)
+        return all(caught_up() for caught_up, input_only in self._pacers if is_input or not input_only)
+
+    def _next_ready(self, streams):
+        """The earliest-due stream whose consumers have caught up, waiting for one; None if the streams changed"""
+        started = time.monotonic()
+        warned = False
+        while streams is self._streams:
+            ready = [s for s in streams if self._ready(s)]
+            if ready:
+                return min(ready, key=lambda s: s.next_time)
+            if not warned and time.monotonic() - started > PACE_WARN_S:
+                warned = True
+                logger.warning("⚠️  Virtual clock held for %ds by a consumer that isn't catching up", PACE_WARN_S)
+            time.sleep(PACE_POLL_S)
+        return None
+
+
+def create_backend(config):
+    """Backend named by audio.backend: sounddevice (default) or virtual"""
+    name = config.get('backend', 'sounddevice')
+    if name == 'sounddevice':
+        return SoundDeviceBackend()
+    if name == 'virtual':
+        virtual = config.get('virtual', {})
+        rate = config.get('sample_rate', 'native')
+        return VirtualBackend.from_config(virtual, virtual.get('sample_rate', 48000) if rate == 'native' else int(rate))
+    raise ValueError(f"Unknown audio backend: {name!r}")
+
+
+def main():
+    """Smoke check: build the configured backend and report its device rates"""
+    from chocopi.config import CONFIG
+    backend = create_backend(CONFIG['audio'])
+    print(f"{type(backend).__name__}: input {backend.default_rate('input')} Hz, output {backend.default_rate('output')} Hz")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Wake word replay benchmark: accuracy and latency from WAV recordings.
+
+Streams recordings through the same WakeWordDetector.process() path used live and
+reports, per framework and model:
+- real-time factor over all chunks, and latency percentiles over the chunks the
+  models ran on (chunks skipped by the energy gate are counted, not timed)
+- recall and detection delay (from the end of each positive utterance)
+- false accepts per hour on negative background recordings
+- a raw-score threshold sweep to help pick thresholds
+- with --verifier, how many first-stage detections the second stage rejected
+
+Positives live in one subdirectory per model name, e.g. positives/hey-choco/*.wav;
+negatives are any WAV files under the negatives directory.
+
+    python -m chocopi.benchmark --positives data/bench/pos --negatives data/bench/neg
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from chocopi.audio import AudioRingBuffer, CAPTURE_RING_SECONDS
+from chocopi.config import CONFIG, MODELS_PATH
+from chocopi.dsp import make_resampler
+from chocopi.provision import ModelUnavailable
+from chocopi.wakeword import ListenStats, WakeWordDetector
+
+logger = logging.getLogger(__name__)
+
+SWEEP_THRESHOLDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+REFRACTORY_S = 2.0  # sweep counts at most one detection per window
+TAIL_S = 1.5  # silence appended after each positive so late detections are caught
+
+
+def load_wav(path, sample_rate):
+    """Load a WAV file as mono int16 at the given sample rate"""
+    audio, rate = sf.read(path, dtype='int16', always_2d=True)
+    audio = np.ascontiguousarray(audio[:, 0])
+    if rate != sample_rate:
+        resampler = make_resampler(rate, sample_rate, CONFIG['audio'].get('resampler', 'polyphase'), max_block=len(audio))
+        audio = resampler.process(audio).copy()
+    return audio
+
+
+def replay(detector, audio, chunk):
+    """Stream audio through the detector; returns per-chunk (score per model, detection, seconds, models ran)"""
+    ring = AudioRingBuffer(int(detector.config['sample_rate'] * CAPTURE_RING_SECONDS))
+    detector.reset(refractory=True)
+    results = []
+    for start in range(0, len(audio) - chunk + 1, chunk):
+        pos = ring.write(audio[start:start + chunk])
+        inferred = detector.stats.inferred
+        started = time.perf_counter()
+        wake_word = detector.process(ring, pos, chunk)
+        elapsed = time.perf_counter() - started
+        results.append((dict(detector.scores), wake_word, elapsed, detector.stats.inferred > inferred))
+        if wake_word:
+            detector.reset()  # a live detection ends the listen window
+    return results
+
+
+def sweep_detections(scores, threshold, chunk_duration):
+    """Detection times (s) for a raw score series at a threshold, with a refractory window"""
+    times = []
+    for i, score in enumerate(scores):
+        t = (i + 1) * chunk_duration
+        if score > threshold and (not times or t - times[-1] >= REFRACTORY_S):
+            times.append(t)
+    return times
+
+
+def benchmark_model(framework, lang, positives, negatives, verify=None):
+    """Benchmark one wake word model; returns a dict of metrics"""
+    model = CONFIG['languages'][lang]['model']
+    detector = WakeWordDetector([lang], framework=framework, verify=verify)
+    verifier = detector.verifier
+    detector.stats = ListenStats(detector.chunk_duration)
+    sample_rate = detector.config['sample_rate']
+    chunk = int(sample_rate * detector.chunk_duration)
+    tail = np.zeros(int(sample_rate * TAIL_S), dtype=np.int16)
+
+    timings = []  # chunks the models ran on
+    total_time = 0.0
+    chunks = 0
+    audio_seconds = 0.0
+    delays = []
+    detected = 0
+    positive_files = sorted((positives / model).glob('*.wav')) if positives else []
+    positive_scores = []
+    for path in positive_files:
+        audio = load_wav(path, sample_rate)
+        utterance_end = len(audio) / sample_rate
+        results = replay(detector, np.concatenate([audio, tail]), chunk)
+        audio_seconds += len(results) * detector.chunk_duration
+        timings.extend(r[2] for r in results if r[3])
+        total_time += sum(r[2] for r in results)
+        chunks += len(results)
+        positive_scores.append([r[0].get(model, 0.0) for r in results])
+        hits = [i for i, r in enumerate(results) if r[1]]
+        if hits:
+            detected += 1
+            delays.append((hits[0] + 1) * detector.chunk_duration - utterance_end)
+
+    rejected_positives = verifier.rejected if verifier else 0
+
+    false_accepts = 0
+    negative_seconds = 0.0
+    negative_scores = []
+    for path in sorted(negatives.rglob('*.wav')) if negatives else []:
+        results = replay(detector, load_wav(path, sample_rate), chunk)
+        negative_seconds += len(results) * detector.chunk_duration
+        timings.extend(r[2] for r in results if r[3])
+        total_time += sum(r[2] for r in results)
+        chunks += len(results)
+        negative_scores.append([r[0].get(model, 0.0) for r in results])
+        false_accepts += sum(1 for r in results if r[1])
+    audio_seconds += negative_seconds
+    rejected_negatives = verifier.rejected - rejected_positives if verifier else 0
+    detector.close()
+
+    sweep = []
+    for threshold in SWEEP_THRESHOLDS:
+        recall = sum(1 for s in positive_scores if sweep_detections(s, threshold, detector.chunk_duration))
+        fa = sum(len(sweep_detections(s, threshold, detector.chunk_duration)) for s in negative_scores)
+        sweep.append((threshold, recall, fa))
+
+    inferred = len(timings)
+    timings = np.array(timings) if timings else np.full(1, np.nan)
+    hours = negative_seconds / 3600
+    return {
+        'framework': framework,
+        'model': model,
+        'rtf': total_time / audio_seconds if audio_seconds else 0.0,
+        'inferred_pct': 100 * inferred / chunks if chunks else 0.0,
+        'p50_ms': np.percentile(timings, 50) * 1000,
+        'p95_ms': np.percentile(timings, 95) * 1000,
+        'p99_ms': np.percentile(timings, 99) * 1000,
+        'positives': len(positive_files),
+        'detected': detected,
+        'delay_ms': np.median(delays) * 1000 if delays else float('nan'),
+        'false_accepts': false_accepts,
+        'fa_per_hour': false_accepts / hours if hours else float('nan'),
+        'negative_hours': hours,
+        'verified': verifier is not None,
+        'rejected_positives': rejected_positives,
+        'rejected_negatives': rejected_negatives,
+        'sweep': sweep,
+    }
+
+
+def print_report(results):
+    print("Latency percentiles cover only the chunks the models ran on (infer%); RTF covers every chunk.")
+    print(f"{'framework':<9} {'model':<15} {'RTF':>6} {'infer%':>7} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7} "
+          f"{'recall':>9} {'delay ms':>9} {'FA':>5} {'FA/h':>7}")
+    for r in results:
+        print(f"{r['framework']:<9} {r['model']:<15} {r['rtf']:>6.3f} {r['inferred_pct']:>7.1f} "
+              f"{r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f} "
+              f"{r['p99_ms']:>7.2f} {r['detected']:>4}/{r['positives']:<4} {r['delay_ms']:>9.0f} "
+              f"{r['false_accepts']:>5} {r['fa_per_hour']:>7.2f}")
+    verified = [r for r in results if r['verified']]
+    if verified:
+        print("\nSecond-stage verifier (first-stage detections rejected):")
+        for r in verified:
+            print(f"  {r['framework']:<7} {r['model']:<15} false wakes rejected: {r['rejected_negatives']}, "
+                  f"true wakes rejected: {r['rejected_positives']}")
+    print("\nRaw score threshold sweep (recall / false accepts per hour):")
+    for r in results:
+        hours = r['negative_hours']
+        cells = ', '.join(
+            f"{threshold:.1f}: {recall}/{r['positives']} {fa / hours if hours else float('nan'):.2f}"
+            for threshold, recall, fa in r['sweep']
+        )
+        print(f"  {r['framework']:<7} {r['model']:<15} {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV recordings through the wake word detector")
+    parser.add_argument('--positives', type=Path, help="directory with one subdirectory of WAVs per model")
+    parser.add_argument('--negatives', type=Path, help="directory of background recordings")
+    parser.add_argument('--frameworks', nargs='+', default=['tflite', 'onnx'], choices=['tflite', 'onnx'])
+    parser.add_argument('--verifier', action='store_true', default=None,
+                        help="enable the second-stage verifier regardless of config")
+    parser.add_argument('--languages', nargs='+', default=list(CONFIG['languages']),
+                        help="languages whose models to benchmark (default: all)")
+    args = parser.parse_args()
+    if not args.positives and not args.negatives:
+        parser.error("at least one of --positives or --negatives is required")
+
+    results = []
+    for framework in args.frameworks:
+        for lang in args.languages:
+            model_file = MODELS_PATH / f"{CONFIG['languages'][lang]['model']}.{framework}"
+            if not model_file.exists():
+                logger.warning("⚠️  Skipping %s: %s not found", lang, model_file.name)
+                continue
+            try:
+                results.append(benchmark_model(framework, lang, args.positives, args.negatives, args.verifier))
+            except ImportError as e:
+                logger.warning("⚠️  Skipping %s framework: %s", framework, e)
+                break
+            except ModelUnavailable as e:
+                raise SystemExit(str(e))
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
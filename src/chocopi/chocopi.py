@@ -8,6 +8,8 @@ from chocopi.wakeword import WakeWordDetector
 from chocopi.conversation import ConversationSession
 from chocopi.display import create_display_manager
 from chocopi.language import warm_language_detector
+from chocopi.provision import ModelUnavailable
+from chocopi.recorder import TapRecorder
 
 logger = logging.getLogger(__name__)
 
@@ -17,22 +19,33 @@ _SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
 class ChocoPi:
     def __init__(self):
         self.profile = CONFIG["profiles"][PROFILE]
-        self.wake_word_detector = WakeWordDetector()
-        profile_langs = set(self.profile["learning_languages"].keys())
-        profile_langs.add(self.profile["native_language"])
-        self.wake_words = [
-            CONFIG["languages"][lang]["wake_word"].lower()
-            for lang in profile_langs
-            if lang in CONFIG["languages"]
-        ]
+        self.wake_word_detector = WakeWordDetector(self._wake_languages(self.profile))
+        self.wake_words = self._wake_words(self.profile)
         self.display = create_display_manager(CONFIG)
+        AUDIO.load_sounds()
         warm_language_detector()
 
+    @staticmethod
+    def _wake_languages(profile):
+        """Languages whose wake word can start a session for the profile"""
+        # Native language has no learning session, so its wake word is never loaded
+        return [lang for lang in profile["learning_languages"] if lang in CONFIG["languages"]]
+
+    def _wake_words(self, profile):
+        return [CONFIG["languages"][lang]["wake_word"].lower() for lang in self._wake_languages(profile)]
+
+    def set_profile(self, name):
+        """Switch the active profile and load only the wake word models it can trigger"""
+        self.profile = CONFIG["profiles"][name]
+        self.wake_words = self._wake_words(self.profile)
+        self.wake_word_detector.set_languages(self._wake_languages(self.profile))
+        logger.info("👤 Profile switched to %s. Say one of '%s'.", self.profile.get("name", name), ', '.join(self.wake_words))
+
     def _wake_word_language(self, wake_word):
         """Get language configuration based on detected wake word"""
-        for lang, config in CONFIG['languages'].items():
-            # Native language has no learning session; its wake word falls through to the default below
-            if wake_word == config['model'] and lang != self.profile["native_language"]:
+        for lang in self._wake_languages(self.profile):
+            config = CONFIG['languages'][lang]
+            if wake_word == config['model']:
                 logger.info("⚙️  Session configured for: %s", config['language_name'])
                 return lang
 
@@ -67,7 +80,16 @@ class ChocoPi:
         if self.display:
             display_task = asyncio.create_task(self.display.run())
 
+        recorder = None
+
         try:
+            # Keep one capture and one output stream open across wake word and conversation phases
+            AUDIO.start_capture()
+            AUDIO.start_output()
+            if CONFIG['audio'].get('recorder', {}).get('enabled', False):
+                recorder = TapRecorder(CONFIG['audio']['recorder'])
+                recorder.start()
+
             while True:
                 # Listen for wake word
                 wake_word = await self.wake_word_detector.listen()
@@ -107,8 +129,12 @@ class ChocoPi:
             logger.info("🧹 Cleaning up...")
 
             # Stop all audio streams
-            AUDIO.stop_recording()
+            if recorder:
+                recorder.stop()
+            AUDIO.stop_capture()
             AUDIO.stop_playing()
+            AUDIO.stop_output()
+            self.wake_word_detector.close()
 
             # Cancel display task
             if display_task:
@@ -121,7 +147,10 @@ class ChocoPi:
 
 
 def main():
-    app = ChocoPi()
+    try:
+        app = ChocoPi()
+    except ModelUnavailable as e:
+        raise SystemExit(str(e))
     asyncio.run(app.run())
 
 if __name__ == '__main__':
@@ -29,6 +29,8 @@ ASSETS_PATH = PROJECT_ROOT / 'assets'
 SOUNDS_PATH = ASSETS_PATH / 'sounds'
 IMAGES_PATH = ASSETS_PATH / 'images'
 FONTS_PATH = ASSETS_PATH / 'fonts'
+DATA_PATH = PROJECT_ROOT / 'data'
+HOSTNAME = platform.node() or 'localhost'
 
 # Load configuration
 try:
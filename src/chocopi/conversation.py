@@ -21,7 +21,7 @@ from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineTask
 from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
-from pipecat.transports.local.audio import LocalAudioTransport, LocalAudioTransportParams
+from pipecat.transports.local.audio import LocalAudioTransportParams
 from rapidfuzz import fuzz
 
 from chocopi.audio import AUDIO
@@ -35,6 +35,7 @@ from chocopi.memory import (
     update_memory,
 )
 from chocopi.providers import create_llm_service
+from chocopi.transport import ChocoPiAudioTransport
 
 logger = logging.getLogger(__name__)
 
@@ -113,8 +114,14 @@ class ChocoPiProcessor(FrameProcessor):
         s._record_transcript("user", transcript, "🗣️  You said: %s", "user")
 
         if s.is_greeting:
+            # Speech from the wake word pre-roll; answer it once the greeting is done
+            s.pending_transcripts.append(transcript)
             return
+        await self._handle_turn(transcript)
 
+    async def _handle_turn(self, transcript: str):
+        """Check a recorded user turn for echo and the sleep word, then respond."""
+        s = self._s
         AUDIO.start_playing(CONFIG["sounds"]["sent"])
 
         # Echo detection
@@ -161,6 +168,11 @@ class ChocoPiProcessor(FrameProcessor):
             s.is_greeting = False
             s.session_start_time = time.monotonic()
             logger.info("👂 Choco is listening...")
+            if s.pending_transcripts:
+                # Everything said during the greeting is one turn; it was already recorded
+                transcript = " ".join(s.pending_transcripts)
+                s.pending_transcripts.clear()
+                await self._handle_turn(transcript)
             return
 
         if s.is_terminating:
@@ -205,6 +217,7 @@ class ConversationSession:
 
         self.last_user_transcript = ""
         self.last_assistant_transcript = ""
+        self.pending_transcripts = []
         self.transcript_log = []
         self.session_start_time = None
         self._consecutive_echo_turns = 0
@@ -282,7 +295,7 @@ class ConversationSession:
 
     async def run(self):
         """Build and run the Pipecat pipeline for this conversation session."""
-        transport = LocalAudioTransport(
+        transport = ChocoPiAudioTransport(
             LocalAudioTransportParams(
                 audio_in_enabled=True,
                 audio_out_enabled=True,
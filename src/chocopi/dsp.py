@@ -0,0 +1,402 @@
+"""Signal processing helpers for the audio path"""
+import numpy as np
+
+INT16_MIN = np.iinfo(np.int16).min
+INT16_MAX = np.iinfo(np.int16).max
+
+
+class StreamResampler:
+    """Streaming linear-interpolation resampler for int16 mono blocks.
+
+    Keeps the last input sample and the fractional read position between calls so
+    consecutive blocks resample without seams. All work happens in preallocated
+    scratch buffers; process() returns a view that is valid until the next call.
+    """
+
+    def __init__(self, src_rate, dst_rate, max_block=4096):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.step = src_rate / dst_rate
+        self._t = 1.0  # read position in [prev, *block] coordinates
+        self._prev = 0.0
+        self._allocate(max_block)
+
+    def _allocate(self, max_block):
+        max_out = int(np.ceil(max_block / self.step)) + 2
+        self._ext = np.empty(max_block + 1, dtype=np.float32)
+        self._offsets = np.arange(max_out, dtype=np.float64) * self.step
+        self._times = np.empty(max_out, dtype=np.float64)
+        self._index = np.empty(max_out, dtype=np.intp)
+        self._frac = np.empty(max_out, dtype=np.float32)
+        self._left = np.empty(max_out, dtype=np.float32)
+        self._right = np.empty(max_out, dtype=np.float32)
+        self._out = np.empty(max_out, dtype=np.int16)
+
+    def process(self, block):
+        """Resample one block; returns an int16 view of the output samples"""
+        n = len(block)
+        if n + 1 > len(self._ext):
+            self._allocate(n)
+        ext = self._ext[:n + 1]
+        ext[0] = self._prev
+        ext[1:] = block
+
+        count = max(0, int(np.ceil((n - self._t) / self.step)))
+        times = self._times[:count]
+        index = self._index[:count]
+        frac = self._frac[:count]
+        left = self._left[:count]
+        right = self._right[:count]
+
+        np.add(self._offsets[:count], self._t, out=times)
+        np.floor(times, out=times)
+        np.copyto(index, times, casting='unsafe')
+        np.add(self._offsets[:count], self._t, out=times)
+        np.subtract(times, index, out=frac, casting='unsafe')
+
+        np.take(ext, index, out=left)
+        index += 1
+        np.take(ext, index, out=right)
+        np.subtract(right, left, out=right)
+        np.multiply(right, frac, out=right)
+        np.add(left, right, out=left)
+
+        self._t = self._t + count * self.step - n
+        self._prev = ext[n]
+        out = self._out[:count]
+        np.copyto(out, left, casting='unsafe')
+        return out
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio polyphase resampler for int16 mono blocks.
+
+    The rate ratio is reduced to up/down factors L/M and a Kaiser-windowed sinc
+    low-pass is split into L phases of `taps` coefficients each. Every output
+    sample is one dot product of a phase with the input window under it, done
+    for the whole block at once from a zero-copy sliding window view. The last
+    taps - 1 input samples and the output phase carry over between blocks, and
+    scratch buffers are preallocated; process() returns a view that is valid
+    until the next call.
+    """
+
+    def __init__(self, src_rate, dst_rate, max_block=4096, taps=32, cutoff=0.9, beta=8.0):
+        gcd = np.gcd(int(src_rate), int(dst_rate))
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up = int(dst_rate) // gcd
+        self.down = int(src_rate) // gcd
+        self.taps = taps
+
+        # Prototype filter at the upsampled rate, cut off below the lower Nyquist
+        length = self.up * taps
+        fc = 0.5 * cutoff / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * fc * np.sinc(2 * fc * n) * np.kaiser(length, beta) * self.up
+        # bank[p, m] multiplies input window sample m (oldest first) for output phase p
+        self.bank = prototype.reshape(taps, self.up).T[:, ::-1].astype(np.float32).copy()
+
+        self._u = 0  # next output time in upsampled samples, relative to the block start
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._allocate(max_block)
+
+    def _allocate(self, max_block):
+        max_out = max_block * self.up // self.down + 2
+        self._ext = np.empty(max_block + self.taps - 1, dtype=np.float32)
+        self._times = np.empty(max_out, dtype=np.int64)
+        self._base = np.empty(max_out, dtype=np.int64)
+        self._phase = np.empty(max_out, dtype=np.int64)
+        self._windows = np.empty((max_out, self.taps), dtype=np.float32)
+        self._filters = np.empty((max_out, self.taps), dtype=np.float32)
+        self._acc = np.empty(max_out, dtype=np.float32)
+        self._out = np.empty(max_out, dtype=np.int16)
+        self._offsets = np.arange(max_out, dtype=np.int64) * self.down
+
+    def process(self, block):
+        """Resample one block; returns an int16 view of the output samples"""
+        n = len(block)
+        if n + self.taps - 1 > len(self._ext):
+            self._allocate(n)
+        k = self.taps - 1
+        ext = self._ext[:n + k]
+        ext[:k] = self._history
+        ext[k:] = block
+
+        count = max(0, -(-(n * self.up - self._u) // self.down))
+        times = self._times[:count]
+        base = self._base[:count]
+        phase = self._phase[:count]
+        np.add(self._offsets[:count], self._u, out=times)
+        np.floor_divide(times, self.up, out=base)
+        np.remainder(times, self.up, out=phase)
+
+        windows = self._windows[:count]
+        np.take(np.lib.stride_tricks.sliding_window_view(ext, self.taps), base, axis=0, out=windows)
+        acc = self._acc[:count]
+        if self.up == 1:
+            np.dot(windows, self.bank[0], out=acc)
+        else:
+            filters = self._filters[:count]
+            np.take(self.bank, phase, axis=0, out=filters)
+            np.einsum('ij,ij->i', windows, filters, out=acc)
+
+        self._u += count * self.down - n * self.up
+        self._history[:] = ext[n:]
+        np.clip(acc, INT16_MIN, INT16_MAX, out=acc)
+        out = self._out[:count]
+        np.copyto(out, acc, casting='unsafe')
+        return out
+
+
+class SoxrResampler:
+    """Streaming resampler backed by python-soxr, for hosts that have it installed"""
+
+    def __init__(self, src_rate, dst_rate, max_block=4096, quality='HQ'):
+        import soxr
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._stream = soxr.ResampleStream(src_rate, dst_rate, 1, dtype='int16', quality=quality)
+
+    def process(self, block):
+        return self._stream.resample_chunk(block)
+
+
+RESAMPLERS = {'linear': StreamResampler, 'polyphase': PolyphaseResampler, 'soxr': SoxrResampler}
+
+
+def make_resampler(src_rate, dst_rate, kind='polyphase', max_block=4096):
+    """Build a streaming resampler; falls back to polyphase when soxr isn't installed"""
+    if kind not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {kind!r}")
+    try:
+        return RESAMPLERS[kind](src_rate, dst_rate, max_block=max_block)
+    except ImportError:
+        return PolyphaseResampler(src_rate, dst_rate, max_block=max_block)
+
+
+class ChannelCombiner:
+    """Reduces multi-channel int16 capture blocks to one channel for the capture bus.
+
+    best: picks the channel with the highest energy above its own tracked noise
+    floor, switching only when another channel is ahead by switch_db so the
+    choice doesn't flap between blocks. sum: delay-and-sum beam, averaging the
+    channels after per-channel integer sample delays (zero for broadside arrays).
+    Per-block work is vectorized over channels in preallocated buffers.
+    """
+
+    MODES = ('best', 'sum')
+
+    def __init__(self, channels, mode='best', delays=None, switch_db=3.0, max_block=4096):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown channel mode: {mode!r}")
+        self.channels = channels
+        self.mode = mode
+        self.switch_db = switch_db
+        self.delays = np.array(delays or [0] * channels, dtype=np.intp)
+        if len(self.delays) != channels:
+            raise ValueError(f"Expected {channels} channel delays, got {len(self.delays)}")
+        self.max_delay = int(self.delays.max())
+        self.channel = 0
+        self.floor_db = None
+        self._level = np.empty(channels, dtype=np.float64)
+        self._snr = np.empty(channels, dtype=np.float64)
+        self._allocate(max_block)
+
+    def _allocate(self, max_block):
+        self._scratch = np.empty((max_block, self.channels), dtype=np.float32)
+        self._ext = np.zeros((self.max_delay + max_block, self.channels), dtype=np.int32)
+        self._sum = np.empty(max_block, dtype=np.int32)
+        self._out = np.empty(max_block, dtype=np.int16)
+
+    def process(self, block):
+        """Combine a (frames, channels) block; returns a mono int16 view"""
+        n = len(block)
+        if n > len(self._sum):
+            self._allocate(n)
+        if self.mode == 'sum':
+            return self._beam(block, n)
+        return block[:, self._select(block, n)]
+
+    def _select(self, block, n):
+        scratch = self._scratch[:n]
+        np.multiply(block, 1 / 32768, out=scratch, dtype=np.float32)
+        np.einsum('ij,ij->j', scratch, scratch, out=self._level, dtype=np.float64)
+        self._level /= n
+        self._level += 1e-10
+        np.log10(self._level, out=self._level)
+        self._level *= 10
+        if self.floor_db is None:
+            self.floor_db = self._level.copy()
+        # Same asymmetric floor tracking as the wake word energy gate
+        alpha = np.where(self._level < self.floor_db, 0.2, 0.005)
+        self.floor_db += alpha * (self._level - self.floor_db)
+        np.subtract(self._level, self.floor_db, out=self._snr)
+        best = int(np.argmax(self._snr))
+        if best != self.channel and self._snr[best] > self._snr[self.channel] + self.switch_db:
+            self.channel = best
+        return self.channel
+
+    def _beam(self, block, n):
+        d = self.max_delay
+        ext = self._ext[:d + n]
+        ext[d:] = block
+        total = self._sum[:n]
+        total.fill(0)
+        for channel, delay in enumerate(self.delays):
+            total += ext[d - delay:d - delay + n, channel]
+        total //= self.channels
+        if d:
+            ext[:d] = ext[n:n + d]  # carry the tail for the next block's delays
+        out = self._out[:n]
+        np.copyto(out, total, casting='unsafe')
+        return out
+
+
+def _dbfs_to_level(dbfs):
+    """dBFS to an int16 mean-absolute level"""
+    return int(32768 * 10 ** (dbfs / 20))
+
+
+class GainControl:
+    """Capture input gain in Q12 fixed point with optional automatic gain control.
+
+    Gain is applied with integer multiply, shift and clip into a preallocated
+    int32 scratch buffer. With AGC on, each block's mean absolute level and peak
+    update a noise floor (fast down, slow up), and during speech the gain moves
+    towards target_dbfs: quickly when peaks would pass peak_dbfs, slowly upwards.
+    The gain never lifts the noise floor above max_noise_dbfs.
+    """
+
+    SHIFT = 12
+    ONE = 1 << SHIFT
+    MAX_GAIN = 15.0  # keeps int16 * gain inside int32
+
+    def __init__(self, gain=1.0, agc=None, max_block=4096):
+        agc = agc or {}
+        self.enabled = agc.get('enabled', False)
+        self.gain_q = int(min(gain, self.MAX_GAIN) * self.ONE)
+        self.min_q = int(agc.get('min_gain', 0.5) * self.ONE)
+        self.max_q = int(min(agc.get('max_gain', 8.0), self.MAX_GAIN) * self.ONE)
+        self.target = _dbfs_to_level(agc.get('target_dbfs', -26))
+        self.peak_limit = _dbfs_to_level(agc.get('peak_dbfs', -3))
+        self.max_floor = _dbfs_to_level(agc.get('max_noise_dbfs', -50))
+        self.speech_ratio_q = int(10 ** (agc.get('speech_margin_db', 6) / 20) * self.ONE)
+        self.floor = 0
+        self.peak = 0
+        self._floor_q = None
+        self._scratch = np.empty(max_block, dtype=np.int32)
+
+    @property
+    def gain(self):
+        return self.gain_q / self.ONE
+
+    def process(self, block):
+        """Apply gain to an int16 block; returns an int32 view clipped to the int16 range"""
+        n = len(block)
+        if n > len(self._scratch):
+            self._scratch = np.empty(n, dtype=np.int32)
+        scratch = self._scratch[:n]
+        if self.enabled and n:
+            self._adapt(block, scratch)
+        np.multiply(block, self.gain_q, out=scratch, dtype=np.int32)
+        np.right_shift(scratch, self.SHIFT, out=scratch)
+        np.clip(scratch, INT16_MIN, INT16_MAX, out=scratch)
+        return scratch
+
+    def _adapt(self, block, scratch):
+        np.copyto(scratch, block)
+        np.abs(scratch, out=scratch)
+        self.peak = int(scratch.max())
+        level = int(scratch.sum()) // len(block)
+
+        # Floor kept in Q8 so the slow upward drift doesn't round away at low levels
+        level_q = level << 8
+        if self._floor_q is None:
+            self._floor_q = level_q
+        elif level_q < self._floor_q:
+            self._floor_q += (level_q - self._floor_q) // 4
+        else:
+            self._floor_q += max(1, (level_q - self._floor_q) >> 10)
+        self.floor = self._floor_q >> 8
+
+        desired = self.gain_q
+        if level * self.ONE > self.floor * self.speech_ratio_q:
+            desired = self.target * self.ONE // max(level, 1)
+        desired = min(desired, (self.max_floor << 8) * self.ONE // max(self._floor_q, 1))
+        desired = max(self.min_q, min(self.max_q, desired))
+
+        limit = self.peak_limit * self.ONE // max(self.peak, 1)
+        if self.gain_q > limit:
+            self.gain_q = max(self.min_q, limit)  # attack: never clip the current block
+        elif desired < self.gain_q:
+            self.gain_q += (desired - self.gain_q) // 8
+        else:
+            self.gain_q += (desired - self.gain_q) // 64
+
+
+class EchoCanceller:
+    """Partitioned-block frequency-domain adaptive filter for acoustic echo cancellation.
+
+    Models the speaker-to-mic path over tail_ms as P partitions of one block each
+    (overlap-save, unconstrained NLMS with per-bin power normalization) and
+    subtracts the predicted echo from the mic. Reference spectra are stored
+    mirrored like the capture ring, so the newest P are always one contiguous
+    view. A Geigel double-talk check freezes adaptation while the near end is
+    louder than the echo could be, so a child talking over the bot doesn't
+    teach the filter to cancel them.
+    """
+
+    def __init__(self, blocksize, sample_rate, tail_ms=150, step=0.3, geigel=0.6):
+        self.blocksize = blocksize
+        self.partitions = max(1, -(-int(sample_rate * tail_ms / 1000) // blocksize))
+        self.step = step
+        self.geigel = geigel
+        bins = blocksize + 1
+        self.weights = np.zeros((self.partitions, bins), dtype=np.complex64)
+        self._spectra = np.zeros((2 * self.partitions, bins), dtype=np.complex64)
+        self._newest = 0
+        self._power = np.full(bins, 1e-3, dtype=np.float32)
+        self._ref = np.zeros(2 * blocksize, dtype=np.float32)
+        self._err = np.zeros(2 * blocksize, dtype=np.float32)
+        self._echo = np.empty(bins, dtype=np.complex64)
+        self._grad = np.empty((self.partitions, bins), dtype=np.complex64)
+        self._peaks = np.zeros(self.partitions, dtype=np.float32)
+        self._out = np.empty(blocksize, dtype=np.int16)
+        self.adapting = True
+
+    def process(self, mic, reference):
+        """Cancel echo of the reference block from the mic block; returns an int16 view"""
+        b = self.blocksize
+        p = self.partitions
+        self._ref[:b] = self._ref[b:]
+        self._ref[b:] = reference
+        self._ref[b:] /= 32768
+        spectrum = np.fft.rfft(self._ref)
+
+        # Newest spectrum first: write at newest and newest + P, window is [newest, newest + P)
+        self._newest = (self._newest - 1) % p
+        self._spectra[self._newest] = spectrum
+        self._spectra[self._newest + p] = spectrum
+        history = self._spectra[self._newest:self._newest + p]
+        self._peaks[1:] = self._peaks[:-1]
+        self._peaks[0] = np.abs(self._ref[b:]).max()
+
+        np.einsum('pk,pk->k', self.weights, history, out=self._echo)
+        echo = np.fft.irfft(self._echo)[b:]
+        err = self._err[b:]
+        np.multiply(mic, 1 / 32768, out=err, dtype=np.float32)
+        err -= echo
+
+        np.multiply(self._power, 0.9, out=self._power)
+        self._power += 0.1 * (spectrum.real ** 2 + spectrum.imag ** 2)
+        # Geigel: near-end speech is louder than any echo of the recent reference
+        self.adapting = np.abs(mic).max() / 32768 < self.geigel * self._peaks.max() or self._peaks.max() == 0
+        if self.adapting and self._peaks.max() > 0:
+            gradient = np.fft.rfft(self._err) * (self.step / (self._power * p + 1e-6))
+            np.multiply(np.conj(history), gradient, out=self._grad)
+            self.weights += self._grad
+
+        err *= 32768
+        np.clip(err, INT16_MIN, INT16_MAX, out=err)
+        np.copyto(self._out, err, casting='unsafe')
+        return self._out
@@ -0,0 +1,151 @@
+"""Round-trip audio latency measurement through the shared output and capture streams.
+
+Plays a chirp through the output mixer at intervals while recording the mic and
+the mixer output (as the echo canceller sees it), locates each probe in both by
+FFT cross-correlation, and reports:
+- delay: mixer output to mic capture, the alignment the echo canceller needs
+- jitter: spread of the delay across probes
+- drift: how fast the delay changes, i.e. input/output clock mismatch
+
+Results are stored per host under data/ and picked up by audio.aec.delay_ms: auto
+and the Gemini barge-in gate. Keep the room quiet and the volume up while it runs.
+
+    python -m chocopi.latency --probes 10
+"""
+import argparse
+import logging
+import time
+import numpy as np
+import yaml
+from chocopi.audio import AUDIO, EchoReference, latency_path
+
+logger = logging.getLogger(__name__)
+
+PROBE_MS = 100
+PROBE_INTERVAL_S = 1.0
+PROBE_DBFS = -12
+MIN_CONFIDENCE = 8.0  # correlation peak over the mean magnitude needed to trust a probe
+
+
+def chirp(sample_rate, duration_ms=PROBE_MS, f0=300, f1=6000):
+    """Exponential sine sweep with short fades, as int16"""
+    n = int(sample_rate * duration_ms / 1000)
+    t = np.arange(n) / sample_rate
+    duration = n / sample_rate
+    k = np.log(f1 / f0)
+    sweep = np.sin(2 * np.pi * f0 * duration / k * (np.exp(t * k / duration) - 1))
+    fade = min(n // 10, int(sample_rate * 0.005))
+    window = np.ones(n)
+    window[:fade] = np.hanning(2 * fade)[:fade]
+    window[n - fade:] = np.hanning(2 * fade)[fade:]
+    return (sweep * window * 32767 * 10 ** (PROBE_DBFS / 20)).astype(np.int16)
+
+
+def locate(signal, template):
+    """Index of template in signal by FFT cross-correlation; returns (index, confidence)"""
+    n = len(signal) + len(template)
+    size = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(signal, size) * np.conj(np.fft.rfft(template, size)), size)[:len(signal)]
+    magnitude = np.abs(corr)
+    index = int(np.argmax(magnitude))
+    return index, magnitude[index] / (magnitude.mean() + 1e-9)
+
+
+def measure(probes=10):
+    """Play probes and return latency statistics for the configured devices"""
+    AUDIO.start_capture()
+    AUDIO.start_output()
+    rate = AUDIO.sample_rate
+    blocksize = int(rate * AUDIO.config['block_duration_ms'] / 1000)
+    reference = AUDIO.echo_reference
+    owned = reference is None
+    if owned:
+        reference = EchoReference(rate, AUDIO.output_rate, AUDIO.resampler, slack=2 * blocksize)
+        AUDIO.echo_reference = reference
+    AUDIO.echo_cancelling = False
+
+    # (capture position, reference write position) at each capture block, as the canceller reads them
+    marks = []
+    subscription = AUDIO.subscribe(rate, blocksize, lambda _s, pos, frames: marks.append((pos, reference.ring.write_pos)))
+    probe = chirp(AUDIO.output_rate)
+    template = chirp(rate)
+
+    delays = []
+    times = []
+    try:
+        time.sleep(PROBE_INTERVAL_S)  # let both streams settle
+        for i in range(probes):
+            capture_start = AUDIO.capture_ring.write_pos
+            reference_start = reference.ring.write_pos
+            started = time.monotonic()
+            AUDIO.start_playing(probe, sample_rate=AUDIO.output_rate)
+            time.sleep(PROBE_INTERVAL_S)
+            mic = AUDIO.capture_ring.read(capture_start, AUDIO.capture_ring.write_pos - capture_start)
+            played = reference.ring.read(reference_start, reference.ring.write_pos - reference_start)
+            if mic is None or played is None:
+                logger.warning("⚠️  Probe %d: recording overran", i + 1)
+                continue
+            arrival, confidence = locate(mic.astype(np.float32), template.astype(np.float32))
+            sent, _ = locate(played.astype(np.float32), template.astype(np.float32))
+            if confidence < MIN_CONFIDENCE:
+                logger.warning("⚠️  Probe %d not heard (confidence %.1f); turn the volume up", i + 1, confidence)
+                continue
+            arrival += capture_start
+            sent += reference_start
+            block = next(((pos, written) for pos, written in marks if pos <= arrival < pos + blocksize), None)
+            if block is None:
+                continue
+            pos, written = block
+            delays.append(written - blocksize + (arrival - pos) - sent)
+            times.append(started)
+            logger.info("📡 Probe %d: %.1fms", i + 1, delays[-1] / rate * 1000)
+    finally:
+        AUDIO.unsubscribe(subscription)
+        AUDIO.echo_cancelling = True
+        if owned:
+            AUDIO.echo_reference = None
+
+    if not delays:
+        raise SystemExit("No probes were heard; check the speaker volume and microphone")
+    delays_ms = np.array(delays) / rate * 1000
+    drift_ppm = 0.0
+    if len(delays) > 2:
+        slope = np.polyfit(np.array(times) - times[0], delays_ms, 1)[0]  # ms per second
+        drift_ppm = slope * 1000
+    return {
+        'delay_ms': round(float(np.median(delays_ms)), 2),
+        'jitter_ms': round(float(delays_ms.std()), 2),
+        'drift_ppm': round(float(drift_ppm), 1),
+        'probes': len(delays),
+        'sample_rate': rate,
+        'output_rate': AUDIO.output_rate,
+        'input_latency_ms': round(AUDIO.input_stream.latency * 1000, 2),
+        'output_latency_ms': round(AUDIO.output_stream.latency * 1000, 2),
+        'measured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure round-trip audio latency on this host")
+    parser.add_argument('--probes', type=int, default=10, help="number of chirps to play")
+    parser.add_argument('--dry-run', action='store_true', help="print results without saving them")
+    args = parser.parse_args()
+    try:
+        result = measure(args.probes)
+    finally:
+        AUDIO.stop_capture()
+        AUDIO.stop_output()
+
+    print(f"Round-trip delay {result['delay_ms']:.1f}ms, jitter {result['jitter_ms']:.2f}ms, "
+          f"drift {result['drift_ppm']:+.1f}ppm over {result['probes']} probes "
+          f"(device-reported {result['input_latency_ms'] + result['output_latency_ms']:.1f}ms)")
+    if not args.dry_run:
+        path = latency_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as file:
+            yaml.safe_dump(result, file, sort_keys=False)
+        print(f"Saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Software mixer for the shared output stream"""
+import asyncio
+import logging
+import time
+import numpy as np
+from chocopi.dsp import INT16_MAX, INT16_MIN
+
+logger = logging.getLogger(__name__)
+
+GAIN_SHIFT = 12  # source gains are Q12 fixed point
+GAIN_ONE = 1 << GAIN_SHIFT
+
+
+def _mix(acc, samples, scratch, gain_q):
+    """Add samples scaled by a Q12 gain into the int32 accumulator"""
+    n = len(samples)
+    scaled = scratch[:n]
+    np.multiply(samples, gain_q, out=scaled, dtype=np.int32)
+    np.right_shift(scaled, GAIN_SHIFT, out=scaled)
+    acc[:n] += scaled
+
+
+def _as_samples(chunk):
+    return np.frombuffer(chunk, dtype=np.int16) if isinstance(chunk, (bytes, bytearray, memoryview)) else chunk
+
+
+class Cue:
+    """One-shot buffer played once from memory, e.g. a cached sound effect"""
+
+    def __init__(self, samples, channel='cue'):
+        self.samples = samples
+        self.channel = channel
+        self.pos = 0
+        self.done = False
+
+    def render(self, acc, scratch, gain_q):
+        if self.done:
+            return
+        n = min(len(acc), len(self.samples) - self.pos)
+        _mix(acc, self.samples[self.pos:self.pos + n], scratch, gain_q)
+        self.pos += n
+        self.done = self.pos >= len(self.samples)
+
+    def stop(self):
+        self.done = True
+
+
+class PlaybackStream:
+    """Streaming source: a preallocated ring filled by one producer, drained by the output callback.
+
+    put() resamples to the mixer rate and blocks while the ring is full, which
+    paces producers at playback speed; feed() does the same for an iterator or
+    async iterator of chunks, so memory stays flat however long the source is.
+    The callback never blocks or allocates; running dry after put() and before
+    the stream is closed counts as one underrun, however many blocks the gap
+    lasts, so idle time on a long-lived stream isn't counted.
+    Positions are absolute sample counts at the mixer rate.
+    """
+
+    def __init__(self, capacity, sample_rate, output_rate, channel='speech', resampler=None):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.output_rate = output_rate
+        self.channel = channel
+        self.resampler = resampler  # converts sample_rate to output_rate when they differ
+        self.write_pos = 0
+        self.read_pos = 0
+        self.underruns = 0
+        self._pending = False  # put() has queued audio since the ring last ran dry
+        self.closed = False  # no more input; the stream ends once drained
+        self.done = False
+        self.task = None  # feeding task when started through AudioManager.play_stream
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._poll = capacity / output_rate / 4
+
+    def put(self, samples):
+        """Queue int16 samples at the stream's rate, waiting for room in the ring"""
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        offset = 0
+        while offset < len(samples) and not self.done:
+            space = self.capacity - (self.write_pos - self.read_pos)
+            if space == 0:
+                time.sleep(self._poll)
+                continue
+            n = min(space, len(samples) - offset)
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = samples[offset:offset + first]
+            self._buffer[:n - first] = samples[offset + first:offset + n]
+            self.write_pos += n
+            offset += n
+            self._pending = True
+
+    async def feed(self, chunks):
+        """Queue every PCM chunk (bytes or int16 array) from an iterator or async iterator, then close"""
+        loop = asyncio.get_running_loop()
+        try:
+            if hasattr(chunks, '__aiter__'):
+                async for chunk in chunks:
+                    await loop.run_in_executor(None, self.put, _as_samples(chunk))
+            else:
+                # Iterators may read from disk, so step them off the event loop too
+                iterator = iter(chunks)
+                while (chunk := await loop.run_in_executor(None, next, iterator, None)) is not None:
+                    await loop.run_in_executor(None, self.put, _as_samples(chunk))
+        finally:
+            self.close()
+
+    async def wait(self):
+        """Wait until everything queued has played"""
+        while not self.done:
+            await asyncio.sleep(self._poll)
+        if self.underruns:
+            logger.warning("⚠️  Playback underran %d times over %.1fs", self.underruns, self.position)
+
+    def close(self):
+        """Mark the end of input; buffered audio still plays out"""
+        self.closed = True
+
+    def stop(self):
+        """Drop buffered audio and end the stream now"""
+        self.closed = True
+        self.done = True
+
+    @property
+    def position(self):
+        """Seconds of audio played so far"""
+        return self.read_pos / self.output_rate
+
+    @property
+    def buffered(self):
+        """Seconds of audio waiting in the ring"""
+        return (self.write_pos - self.read_pos) / self.output_rate
+
+    def render(self, acc, scratch, gain_q):
+        if self.done:
+            return
+        n = min(len(acc), self.write_pos - self.read_pos)
+        if n < len(acc) and self._pending and not self.closed:
+            self.underruns += 1
+            self._pending = False
+        start = self.read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        _mix(acc, self._buffer[start:start + first], scratch, gain_q)
+        if n > first:
+            _mix(acc[first:], self._buffer[:n - first], scratch, gain_q)
+        self.read_pos += n
+        self.done = self.closed and self.read_pos == self.write_pos
+
+
+class OutputMixer:
+    """Sums cue and speech sources into the output stream with per-channel gain and ducking.
+
+    Sources live in a copy-on-write tuple, so the audio thread never sees a
+    half-updated list; finished sources flag themselves done and are pruned on
+    the next add. While any cue plays, speech is ducked by duck_db. Channel
+    gains move towards their targets a step per block so ducking doesn't click.
+    """
+
+    def __init__(self, sample_rate, blocksize, config):
+        self.sample_rate = sample_rate
+        self.targets = {'cue': config.get('cue_gain', 1.0), 'speech': config.get('speech_gain', 1.0)}
+        self.duck = 10 ** (config.get('duck_db', -12) / 20)
+        self.levels = {channel: int(gain * GAIN_ONE) for channel, gain in self.targets.items()}
+        self.sources = ()
+        self._allocate(blocksize)
+
+    def _allocate(self, blocksize):
+        self._acc = np.zeros(blocksize, dtype=np.int32)
+        self._scratch = np.empty(blocksize, dtype=np.int32)
+
+    def add(self, source):
+        self.sources = tuple(s for s in self.sources if not s.done) + (source,)
+        return source
+
+    def stop(self, channel=None):
+        """Stop every source, or only those on one channel"""
+        for source in self.sources:
+            if channel is None or source.channel == channel:
+                source.stop()
+        self.sources = tuple(s for s in self.sources if not s.done)
+
+    def render(self, out):
+        """Mix one output block into out (int16) from the audio callback"""
+        n = len(out)
+        if n > len(self._acc):
+            self._allocate(n)
+        acc = self._acc[:n]
+        acc.fill(0)
+        sources = self.sources
+        ducked = any(s.channel == 'cue' and not s.done for s in sources)
+        for channel, gain in self.targets.items():
+            target = int(gain * (self.duck if ducked and channel == 'speech' else 1.0) * GAIN_ONE)
+            level = self.levels[channel]
+            self.levels[channel] = level + (target - level) // 4 if abs(target - level) > 4 else target
+        for source in sources:
+            source.render(acc, self._scratch, self.levels[source.channel])
+        np.clip(acc, INT16_MIN, INT16_MAX, out=acc)
+        np.copyto(out, acc, casting='unsafe')
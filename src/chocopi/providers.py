@@ -1,9 +1,15 @@
 """Pipecat LLM service factories for each supported provider"""
 import logging
 import os
+import time
+from collections import deque
+from chocopi.config import CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Input frames held while a provider connects (wake word pre-roll arrives before it is ready)
+PENDING_AUDIO_FRAMES = 500
+
 
 def create_llm_service(provider_name, provider_config, session_instructions, transcription_instructions="", greeting_instructions=""):
     """
@@ -36,6 +42,8 @@ def _openai_realtime(config, session_instructions, transcription_instructions):
        so they must be patched post-serialization)
     4. _truncate_current_audio_response is a no-op to prevent invalid_value server
        errors when Pipecat's byte count exceeds server's committed bytes on interruption
+    5. _send_user_audio holds input audio until session.updated, so the wake word
+       pre-roll replayed at pipeline start reaches the configured session
     """
     from pipecat.frames.frames import LLMRunFrame, TranscriptionFrame
     from pipecat.processors.frame_processor import FrameDirection
@@ -57,6 +65,15 @@ def _openai_realtime(config, session_instructions, transcription_instructions):
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self._response_instructions: str | None = None
+            self._pending_audio = deque(maxlen=PENDING_AUDIO_FRAMES)
+
+        async def _send_user_audio(self, frame):
+            if not self._api_session_ready:
+                self._pending_audio.append(frame)
+                return
+            while self._pending_audio:
+                await super()._send_user_audio(self._pending_audio.popleft())
+            await super()._send_user_audio(frame)
 
         async def process_frame(self, frame, direction):
             if isinstance(frame, LLMRunFrame):
@@ -167,10 +184,16 @@ def _gemini_live(config, session_instructions, greeting_instructions=""):
     TranscriptionFrame: pushed DOWNSTREAM in addition to the base class's UPSTREAM push
     so ChocoPiProcessor can observe user transcripts.
 
-    Audio gate: mic audio is suppressed while the bot is speaking to prevent hardware echo
-    from triggering Gemini's server-side VAD. The base class ignores BotStartedSpeakingFrame
-    / BotStoppedSpeakingFrame (it tracks speaking state via server events), so we intercept
-    them here to gate _send_user_audio without interfering with the base class's own state.
+    Audio gate: unless audio.aec is on, mic audio is suppressed while the bot is speaking
+    to prevent hardware echo from triggering Gemini's server-side VAD. The base class ignores
+    BotStartedSpeakingFrame / BotStoppedSpeakingFrame (it tracks speaking state via server
+    events), so we intercept them here to gate _send_user_audio without interfering with
+    the base class's own state. The gate stays shut for the echo still in flight after the
+    bot stops (measured round trip plus the output buffer). With echo cancellation the mic
+    stays open for barge-in.
+
+    Pre-roll: audio arriving before the session accepts realtime input (the wake word
+    pre-roll replayed at pipeline start) is held and flushed once it is ready.
     """
     from pipecat.frames.frames import BotStartedSpeakingFrame, BotStoppedSpeakingFrame, TranscriptionFrame
     from pipecat.processors.frame_processor import FrameDirection
@@ -185,23 +208,38 @@ def _gemini_live(config, session_instructions, greeting_instructions=""):
         full_system_instruction = session_instructions
 
     _greeting = bool(greeting_instructions)
+    _echo_cancelled = CONFIG['audio'].get('aec', {}).get('enabled', False)
+    _echo_tail = 0.0
+    if not _echo_cancelled:
+        from chocopi.audio import load_latency
+        measured = load_latency() or {}
+        _echo_tail = (measured.get('delay_ms', 0) + CONFIG['audio'].get('output_buffer_ms', 200)) / 1000
 
     class GeminiLiveLLMService(_GeminiBase):
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self._gate_audio = False
+            self._gate_until = 0.0
+            self._pending_audio = deque(maxlen=PENDING_AUDIO_FRAMES)
 
         # Audio gate: suppress mic input while bot is speaking to prevent echo VAD triggers
         async def process_frame(self, frame, direction):
             if isinstance(frame, BotStartedSpeakingFrame):
-                self._gate_audio = True
+                self._gate_audio = not _echo_cancelled
             elif isinstance(frame, BotStoppedSpeakingFrame):
+                if self._gate_audio:
+                    self._gate_until = time.monotonic() + _echo_tail
                 self._gate_audio = False
             await super().process_frame(frame, direction)
 
         async def _send_user_audio(self, frame):
-            if self._gate_audio:
+            if self._gate_audio or time.monotonic() < self._gate_until:
+                return
+            if not self._ready_for_realtime_input:
+                self._pending_audio.append(frame)
                 return
+            while self._pending_audio:
+                await super()._send_user_audio(self._pending_audio.popleft())
             await super()._send_user_audio(frame)
 
         # TranscriptionFrame: also push downstream for ChocoPiProcessor
@@ -0,0 +1,132 @@
+"""Offline-first provisioning and verification of wake word models"""
+import argparse
+import hashlib
+import logging
+import re
+import urllib.request
+from pathlib import Path
+import yaml
+from chocopi.config import CONFIG, MODELS_PATH
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = MODELS_PATH / 'manifest.yml'
+
+
+class ModelUnavailable(RuntimeError):
+    """A wake word model is missing or corrupt and could not be fetched"""
+
+
+def _openwakeword_models_path():
+    import openwakeword
+    return Path(openwakeword.__file__).parent / 'resources' / 'models'
+
+
+def load_manifest():
+    with MANIFEST_PATH.open('r', encoding='utf-8') as file:
+        return yaml.safe_load(file)
+
+
+def _entries(manifest):
+    """Yield (name, path, entry) for every file in the manifest"""
+    feature_dir = _openwakeword_models_path()
+    for name, entry in manifest.get('openwakeword', {}).items():
+        yield name, feature_dir / name, entry
+    for name, entry in manifest.get('custom', {}).items():
+        yield name, MODELS_PATH / name, entry
+
+
+def _required(framework, languages):
+    """File names needed to run the given framework and languages"""
+    names = {f"melspectrogram.{framework}", f"embedding_model.{framework}", "silero_vad.onnx"}
+    for lang in languages:
+        models = [CONFIG['languages'][lang]['model'], *CONFIG['languages'][lang].get('verifier_models', [])]
+        names.update(f"{model}.{framework}" for model in models)
+    return names
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _verify(name, path, entry):
+    """Return None if the file is present and matches its checksum, else the reason it doesn't"""
+    if not path.exists() or path.stat().st_size == 0:
+        return "missing"
+    expected = entry.get('sha256')
+    if expected and _sha256(path) != expected:
+        return "checksum mismatch"
+    return None
+
+
+def _fetch(name, path, entry):
+    url = entry.get('url')
+    if not url:
+        raise ModelUnavailable(f"Wake word model {name} is missing and has no download URL in {MANIFEST_PATH}")
+    logger.info("⬇️  Downloading %s...", name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+    with urllib.request.urlopen(url, timeout=60) as response, open(partial, 'wb') as file:
+        while block := response.read(1 << 20):
+            file.write(block)
+    partial.replace(path)
+    if reason := _verify(name, path, entry):
+        path.unlink()
+        raise ModelUnavailable(f"Downloaded wake word model {name} failed verification: {reason}")
+
+
+def ensure_models(framework, languages):
+    """Verify the models needed at startup from disk, touching the network only for missing files"""
+    required = _required(framework, languages)
+    for name, path, entry in _entries(load_manifest()):
+        if name not in required:
+            continue
+        reason = _verify(name, path, entry)
+        if reason is None:
+            continue
+        logger.warning("⚠️  Wake word model %s: %s", name, reason)
+        try:
+            _fetch(name, path, entry)
+        except OSError as e:
+            raise ModelUnavailable(f"Wake word model {name} is unavailable and could not be downloaded: {e}") from e
+
+
+def provision(pin=False):
+    """Fetch and verify every model in the manifest; optionally record missing checksums"""
+    manifest_text = MANIFEST_PATH.read_text(encoding='utf-8')
+    failures = 0
+    for name, path, entry in _entries(load_manifest()):
+        reason = _verify(name, path, entry)
+        if reason:
+            try:
+                _fetch(name, path, entry)
+            except (OSError, ModelUnavailable) as e:
+                logger.error("❌ %s: %s", name, e)
+                failures += 1
+                continue
+        if not entry.get('sha256'):
+            if pin:
+                pattern = rf"(^  {re.escape(name)}:\n(?:    .*\n)*?    sha256: )null"
+                manifest_text = re.sub(pattern, rf"\g<1>{_sha256(path)}", manifest_text, flags=re.MULTILINE)
+                logger.info("📌 %s pinned", name)
+            else:
+                logger.warning("⚠️  %s has no checksum; run with --pin to record one", name)
+        logger.info("✅ %s", name)
+    if pin:
+        MANIFEST_PATH.write_text(manifest_text, encoding='utf-8')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and verify ChocoPi wake word models")
+    parser.add_argument('--pin', action='store_true', help="record checksums for manifest entries without one")
+    args = parser.parse_args()
+    raise SystemExit(1 if provision(pin=args.pin) else 0)
+
+
+if __name__ == '__main__':
+    main()
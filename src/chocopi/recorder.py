@@ -0,0 +1,169 @@
+"""Opt-in background recorder for the capture and playback paths"""
+import logging
+import threading
+import time
+import soundfile as sf
+from chocopi.audio import AUDIO, AudioRingBuffer, CAPTURE_RING_SECONDS
+from chocopi.config import DATA_PATH
+from chocopi.dsp import make_resampler
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'flac': ('flac', 'FLAC', 'PCM_16'),
+    'opus': ('ogg', 'OGG', 'OPUS'),
+}
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)  # the only rates libopus encodes
+
+
+class _Tap:
+    """One recorded stream: a ring written by an audio callback and this recorder's read position"""
+
+    def __init__(self, name, ring, sample_rate, file_rate, resampler):
+        self.name = name
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.file_rate = file_rate
+        self.resampler = resampler  # sample_rate to file_rate, when the format needs another rate
+        self.pos = ring.write_pos
+        self.file = None
+        self.path = None
+        self.dropped = 0
+
+
+class TapRecorder:
+    """Writes the mic and speaker streams to rolling compressed segments on disk.
+
+    The audio callbacks only ever write into in-memory rings (the capture bus
+    ring, and a playback ring the output callback fills while a recorder is
+    attached); they never wait on this recorder. A background thread copies new
+    samples out every flush_s and encodes them with soundfile, starting a new
+    segment every segment_s. When the recordings directory passes max_mb, the
+    oldest segments are deleted. If the disk stalls long enough for the rings to
+    wrap, the lost audio is counted and skipped rather than blocking capture; if
+    a segment can't be opened or written, that stream is skipped until the next
+    segment. Opus segments are resampled to the nearest rate Opus supports.
+    """
+
+    def __init__(self, config):
+        self.path = DATA_PATH / config.get('path', 'recordings')
+        self.extension, self.format, self.subtype = FORMATS[config.get('format', 'flac')]
+        self.segment_s = config.get('segment_s', 60)
+        self.flush_s = config.get('flush_s', 0.5)
+        self.max_bytes = int(config.get('max_mb', 500) * 1024 * 1024)
+        self.sources = config.get('sources', ['mic', 'speaker'])
+        self.resampler = AUDIO.resampler
+        self.taps = []
+        self.segment_started = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Attach to the shared streams and start the writer thread"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        if 'mic' in self.sources:
+            AUDIO.start_capture()
+            self.taps.append(self._tap('mic', AUDIO.capture_ring, AUDIO.sample_rate))
+        if 'speaker' in self.sources:
+            AUDIO.start_output()
+            if AUDIO.playback_ring is None:
+                AUDIO.playback_ring = AudioRingBuffer(int(AUDIO.output_rate * CAPTURE_RING_SECONDS))
+            self.taps.append(self._tap('speaker', AUDIO.playback_ring, AUDIO.output_rate))
+        self._thread = threading.Thread(target=self._run, name="tap-recorder", daemon=True)
+        self._thread.start()
+        AUDIO.pace(self._caught_up)
+        logger.info("⏺️  Recording %s to %s (%s, %d MB cap)", ', '.join(self.sources), self.path, self.format, self.max_bytes >> 20)
+
+    def _tap(self, name, ring, sample_rate):
+        file_rate = sample_rate
+        if self.subtype == 'OPUS' and sample_rate not in OPUS_RATES:
+            file_rate = next((rate for rate in OPUS_RATES if rate >= sample_rate), OPUS_RATES[-1])
+            logger.info("⏺️  Recording %s at %d Hz; Opus can't encode %d Hz", name, file_rate, sample_rate)
+        resampler = make_resampler(sample_rate, file_rate, self.resampler) if file_rate != sample_rate else None
+        return _Tap(name, ring, sample_rate, file_rate, resampler)
+
+    def _caught_up(self):
+        """Virtual clocks wait on this so the rings can't wrap between flushes"""
+        return self._stop.is_set() or all(tap.ring.write_pos - tap.pos < tap.ring.capacity // 2 for tap in self.taps)
+
+    def stop(self):
+        """Flush what's buffered, close the open segments and detach"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        AUDIO.playback_ring = None
+
+    def _run(self):
+        while not self._stop.wait(self.flush_s):
+            self._drain()
+        self._drain()
+        self._close_segment()
+
+    def _drain(self):
+        now = time.monotonic()
+        if now - self.segment_started >= self.segment_s:
+            self._close_segment()
+            self._open_segment()
+            self.segment_started = now
+        for tap in self.taps:
+            try:
+                self._drain_tap(tap)
+            except Exception as e:
+                logger.error("❌ Recorder error on %s: %s", tap.name, e)
+                self._close_file(tap)  # skip this stream until the next segment
+
+    def _drain_tap(self, tap):
+        end = tap.ring.write_pos
+        oldest = end - tap.ring.capacity
+        if tap.pos < oldest:
+            tap.dropped += oldest - tap.pos
+            logger.warning("⚠️  Recorder fell behind; skipped %.1fs of %s audio", (oldest - tap.pos) / tap.sample_rate, tap.name)
+            tap.pos = oldest
+        block = tap.ring.read(tap.pos, end - tap.pos)
+        tap.pos = end
+        if block is None or not len(block) or not tap.file:
+            return
+        tap.file.write(tap.resampler.process(block) if tap.resampler else block)
+
+    def _open_segment(self):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        for tap in self.taps:
+            tap.path = self.path / f"{stamp}_{tap.name}.{self.extension}"
+            try:
+                tap.file = sf.SoundFile(
+                    tap.path, mode='w', samplerate=tap.file_rate, channels=1, format=self.format, subtype=self.subtype
+                )
+            except Exception as e:
+                logger.error("❌ Recorder can't open %s: %s", tap.path.name, e)
+
+    def _close_segment(self):
+        closed = False
+        for tap in self.taps:
+            closed = self._close_file(tap) or closed
+        if closed:
+            try:
+                self._evict()
+            except OSError as e:
+                logger.error("❌ Recorder can't evict old segments: %s", e)
+
+    @staticmethod
+    def _close_file(tap):
+        """Close a tap's segment; returns True if one was open"""
+        if not tap.file:
+            return False
+        file, tap.file = tap.file, None
+        try:
+            file.close()
+        except Exception as e:
+            logger.error("❌ Recorder can't finish %s: %s", tap.path.name, e)
+        return True
+
+    def _evict(self):
+        """Delete the oldest segments until the directory fits under max_mb"""
+        segments = sorted(self.path.glob(f"*.{self.extension}"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in segments)
+        while segments and total > self.max_bytes:
+            oldest = segments.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+            logger.debug("🗑️  Evicted recording %s", oldest.name)
@@ -0,0 +1,127 @@
+"""Pipecat transports backed by the shared AudioManager streams"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pipecat.frames.frames import CancelFrame, EndFrame, InputAudioRawFrame, OutputAudioRawFrame, StartFrame
+from pipecat.transports.base_input import BaseInputTransport
+from pipecat.transports.base_output import BaseOutputTransport
+from pipecat.transports.base_transport import BaseTransport
+from pipecat.transports.local.audio import LocalAudioTransportParams
+
+from chocopi.audio import AUDIO
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureBusInputTransport(BaseInputTransport):
+    """Input transport that subscribes to the capture bus instead of opening its own device"""
+
+    def __init__(self, params: LocalAudioTransportParams):
+        super().__init__(params)
+        self._subscription = None
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        if self._subscription:
+            return
+
+        loop = self.get_event_loop()
+        sample_rate = self.sample_rate
+        blocksize = int(sample_rate / 100) * 2  # 20ms of audio
+
+        def on_block(subscription, pos, frames):
+            block = subscription.read(pos, frames)
+            if block is None:
+                return
+            audio_frame = InputAudioRawFrame(audio=block.tobytes(), sample_rate=sample_rate, num_channels=1)
+            asyncio.run_coroutine_threadsafe(self.push_audio_frame(audio_frame), loop)
+
+        # Start from the wake word so speech said before the session was ready isn't lost
+        self._subscription = AUDIO.subscribe(sample_rate, blocksize, on_block, start_pos=AUDIO.take_preroll())
+        logger.debug("🎙️  Session input subscribed to capture bus at %d Hz", sample_rate)
+        await self.set_transport_ready(frame)
+
+    async def stop(self, frame: EndFrame):
+        self._unsubscribe()
+        await super().stop(frame)
+
+    async def cancel(self, frame: CancelFrame):
+        self._unsubscribe()
+        await super().cancel(frame)
+
+    async def cleanup(self):
+        self._unsubscribe()
+        await super().cleanup()
+
+    def _unsubscribe(self):
+        if self._subscription:
+            AUDIO.unsubscribe(self._subscription)
+            self._subscription = None
+
+
+class MixerOutputTransport(BaseOutputTransport):
+    """Output transport that plays assistant audio through the shared output mixer"""
+
+    def __init__(self, params: LocalAudioTransportParams):
+        super().__init__(params)
+        self._stream = None
+        # put() blocks while the mixer ring is full, pacing frames at playback speed
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        if self._stream:
+            return
+        self._stream = AUDIO.open_stream(self.sample_rate)
+        logger.debug("🔈 Session output streaming to mixer at %d Hz", self.sample_rate)
+        await self.set_transport_ready(frame)
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        self._close()
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        self._close(flush=True)
+
+    async def cleanup(self):
+        await super().cleanup()
+        self._close()
+        self._executor.shutdown(wait=False)
+
+    async def write_audio_frame(self, frame: OutputAudioRawFrame) -> bool:
+        if not self._stream:
+            return False
+        samples = np.frombuffer(frame.audio, dtype=np.int16)
+        await self.get_event_loop().run_in_executor(self._executor, self._stream.put, samples)
+        return True
+
+    def _close(self, flush=False):
+        if self._stream:
+            if flush:
+                self._stream.stop()
+            else:
+                self._stream.close()
+            self._stream = None
+
+
+class ChocoPiAudioTransport(BaseTransport):
+    """Local transport on the process-wide capture bus and output mixer"""
+
+    def __init__(self, params: LocalAudioTransportParams):
+        super().__init__()
+        self._params = params
+        self._input: CaptureBusInputTransport | None = None
+        self._output: MixerOutputTransport | None = None
+
+    def input(self) -> CaptureBusInputTransport:
+        if not self._input:
+            self._input = CaptureBusInputTransport(self._params)
+        return self._input
+
+    def output(self) -> MixerOutputTransport:
+        if not self._output:
+            self._output = MixerOutputTransport(self._params)
+        return self._output
@@ -2,84 +2,813 @@
 import asyncio
 import os
 import logging
-import queue
-import openwakeword
+import threading
+from collections import deque
+from datetime import datetime
+import time
+import numpy as np
+import yaml
 from openwakeword.model import Model
-from chocopi.config import CONFIG, IS_PI, MODELS_PATH
+from openwakeword.vad import VAD
+from chocopi.config import CONFIG, DATA_PATH, HOSTNAME, IS_PI, MODELS_PATH
 from chocopi.audio import AUDIO
+from chocopi.provision import ensure_models
 
 logger = logging.getLogger(__name__)
 
+# Control messages for the inference worker
+_ARM = 'arm'
+_LOAD = 'load'
+_STOP = 'stop'
+
+FRAMEWORKS = ('tflite', 'onnx')
+PROBE_CHUNKS = 25  # ~2s of audio per framework
+DROP_LOG_INTERVAL = 10  # seconds between dropped-frame warnings
+MODEL_FRAME = 1280  # samples per openWakeWord frame (80ms at 16kHz)
+
+
+def _framework_cache_path():
+    return DATA_PATH / f"framework_{HOSTNAME}.yml"
+
+
+def _probe_framework(framework, languages, chunk):
+    """Time model.predict for one framework on synthetic audio; returns seconds per chunk"""
+    ensure_models(framework, languages)
+    model = Model(
+        inference_framework=framework,
+        wakeword_models=[
+            os.path.join(MODELS_PATH, f"{CONFIG['languages'][lang]['model']}.{framework}") for lang in languages
+        ],
+    )
+    audio = (np.random.default_rng(0).standard_normal(chunk * (PROBE_CHUNKS + 5)) * 1000).astype(np.int16)
+    for i in range(5):  # warm up
+        model.predict(audio[i * chunk:(i + 1) * chunk])
+    started = time.perf_counter()
+    for i in range(5, PROBE_CHUNKS + 5):
+        model.predict(audio[i * chunk:(i + 1) * chunk])
+    return (time.perf_counter() - started) / PROBE_CHUNKS
+
+
+def select_framework(languages):
+    """Pick the inference framework from config, or the fastest one on this host when set to auto.
+
+    The auto probe runs once per host and its result is cached under data/; delete
+    the cache file to re-probe after changing hardware or runtimes.
+    """
+    config = CONFIG['openwakeword']
+    framework = config.get('inference_framework', 'auto')
+    if framework in FRAMEWORKS:
+        return framework
+    if framework != 'auto':
+        raise ValueError(f"Unknown inference framework: {framework!r}")
+
+    cache_path = _framework_cache_path()
+    if cache_path.exists():
+        with cache_path.open('r', encoding='utf-8') as file:
+            cached = yaml.safe_load(file) or {}
+        if cached.get('framework') in FRAMEWORKS:
+            return cached['framework']
+
+    chunk = int(config['sample_rate'] * config['chunk_duration_ms'] / 1000)
+    timings = {}
+    for candidate in FRAMEWORKS:
+        try:
+            timings[candidate] = _probe_framework(candidate, languages, chunk)
+        except Exception as e:
+            logger.warning("⚠️  %s unavailable for wake word inference: %s", candidate.upper(), e)
+    if not timings:
+        return 'tflite' if IS_PI else 'onnx'
+
+    framework = min(timings, key=timings.get)
+    logger.info(
+        "⏱️  Inference framework probe: %s; using %s",
+        ', '.join(f"{name.upper()} {t * 1000:.2f}ms/chunk" for name, t in timings.items()), framework.upper(),
+    )
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with cache_path.open('w', encoding='utf-8') as file:
+        yaml.safe_dump({
+            'framework': framework,
+            'ms_per_chunk': {name: round(t * 1000, 3) for name, t in timings.items()},
+            'probed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }, file, sort_keys=False)
+    return framework
+
+
+class FrameQueue:
+    """Bounded FIFO between the capture callback and the inference worker.
+
+    Control messages are never dropped. When more than max_frames frames are
+    waiting, the oldest frame is dropped. With the catch_up policy the worker
+    drains the whole backlog and runs it through the models as one batch.
+    The worker is only woken once wake_frames frames are waiting (eco mode
+    raises it) or a control message arrives.
+    """
+
+    POLICIES = ('drop_oldest', 'catch_up')
+
+    def __init__(self, max_frames=8, policy='drop_oldest'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown frame queue policy: {policy!r}")
+        self.max_frames = max_frames
+        self.policy = policy
+        self._items = deque()
+        self._frames = 0
+        self._controls = 0
+        self._waiting = False
+        self.wake_frames = 1
+        self._cond = threading.Condition()
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put_frame(self, item):
+        """Enqueue a frame from the audio callback, dropping the oldest frame if full"""
+        with self._cond:
+            if self._frames >= self.max_frames:
+                for i, queued in enumerate(self._items):
+                    if not isinstance(queued[0], str):
+                        del self._items[i]
+                        break
+                self._frames -= 1
+                self.dropped += 1
+            self._items.append(item)
+            self._frames += 1
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._frames)
+            if self._ready():
+                self._cond.notify()
+
+    def put_control(self, item):
+        with self._cond:
+            self._items.append(item)
+            self._controls += 1
+            self._cond.notify()
+
+    def _ready(self):
+        return self._controls or self._frames >= self.wake_frames
+
+    def get(self):
+        """Block until a control message or wake_frames frames are waiting, then take the next item"""
+        with self._cond:
+            self._waiting = True
+            self._cond.wait_for(self._ready)
+            self._waiting = False
+            item = self._items.popleft()
+            if isinstance(item[0], str):
+                self._controls -= 1
+            else:
+                self._frames -= 1
+            return item
+
+    def drain_frames(self):
+        """Take every frame queued ahead of the next control message"""
+        frames = []
+        with self._cond:
+            while self._items and not isinstance(self._items[0][0], str):
+                frames.append(self._items.popleft())
+            self._frames -= len(frames)
+        return frames
+
+    def depth(self):
+        return self._frames
+
+    def idle(self):
+        """True while the worker is waiting with nothing it would wake for"""
+        with self._cond:
+            return self._waiting and not self._ready()
+
+
+class ListenStats:
+    """Frame lag, inference time, backlog, CPU and wake latency measured over one listen() call"""
+
+    def __init__(self, chunk_duration, frame_queue=None):
+        self.chunk_duration = chunk_duration
+        self.frame_queue = frame_queue
+        self.dropped_at_start = frame_queue.dropped if frame_queue else 0
+        self.started_at = time.monotonic()
+        self.cpu_started_at = time.process_time()
+        self.frames = 0
+        self.inferred = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.total_inference = 0.0
+        self.max_inference = 0.0
+        self.max_backlog = 0
+        self.warned = False
+
+    def record_lag(self, lag):
+        """Record the delay between frame capture and the worker picking it up"""
+        self.frames += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def record_inference(self, duration, backlog):
+        """Record one model.predict call and the number of frames still waiting behind it"""
+        self.inferred += 1
+        self.total_inference += duration
+        self.max_inference = max(self.max_inference, duration)
+        self.max_backlog = max(self.max_backlog, backlog)
+        if not self.warned and duration > self.chunk_duration and backlog > 1:
+            self.warned = True
+            logger.warning(
+                "⚠️  Wake word inference is falling behind real time (%.1fms per %.0fms chunk, backlog %d)",
+                duration * 1000, self.chunk_duration * 1000, backlog,
+            )
+
+    def log(self, wake_latency=None):
+        """Log a summary of the listen window"""
+        elapsed = time.monotonic() - self.started_at
+        cpu = time.process_time() - self.cpu_started_at
+        avg_lag = self.total_lag / self.frames if self.frames else 0.0
+        avg_inference = self.total_inference / self.inferred if self.inferred else 0.0
+        dropped = self.frame_queue.dropped - self.dropped_at_start if self.frame_queue else 0
+        logger.info(
+            "📊 Listen stats: %d frames (%d inferred, %d dropped) in %.1fs, CPU %.1f%%, lag avg %.1fms / max %.1fms, "
+            "inference avg %.1fms / max %.1fms, max backlog %d, wake latency %s",
+            self.frames, self.inferred, dropped, elapsed, 100 * cpu / elapsed if elapsed else 0.0,
+            avg_lag * 1000, self.max_lag * 1000,
+            avg_inference * 1000, self.max_inference * 1000, self.max_backlog,
+            f"{wake_latency * 1000:.1f}ms" if wake_latency is not None else "n/a",
+        )
+
+
+class EnergyGate:
+    """Noise-floor energy gate that lets silent frames skip wake word inference.
+
+    The floor follows quiet frames quickly and loud ones slowly, so steady room
+    noise raises it while speech onsets stand out. A hangover keeps the gate open
+    through pauses, and an optional Silero VAD check confirms gate openings.
+    """
+
+    def __init__(self, config, chunk_duration, blocksize):
+        self.enabled = config.get('enabled', True)
+        self.margin_db = config.get('margin_db', 6)
+        self.min_dbfs = config.get('min_dbfs', -65)
+        self.extra_margin_db = 0  # raised by eco mode
+        self.hangover_chunks = int(config.get('hangover_ms', 1500) / 1000 / chunk_duration)
+        self.preroll_chunks = int(config.get('preroll_ms', 500) / 1000 / chunk_duration)
+        self.vad_threshold = config.get('vad_threshold', 0)
+        self.vad = VAD() if self.vad_threshold > 0 else None
+        self.floor_db = None
+        self.hold = 0
+        self.is_open = True
+        self._scratch = np.empty(blocksize, dtype=np.float32)
+
+    def reset(self):
+        """Start a listen window with the gate open so the models warm up on live audio"""
+        self.hold = self.hangover_chunks
+        self.is_open = True
+
+    def level_db(self, chunk):
+        """Mean frame energy in dBFS, computed without allocating"""
+        scratch = self._scratch[:len(chunk)]
+        np.multiply(chunk, 1 / 32768, out=scratch, dtype=np.float32)
+        energy = float(np.dot(scratch, scratch)) / len(chunk)
+        return 10 * np.log10(energy + 1e-10)
+
+    def update(self, chunk):
+        """Classify a frame; returns True while the models should run"""
+        if not self.enabled:
+            return True
+
+        level = self.level_db(chunk)
+        if self.floor_db is None:
+            self.floor_db = level
+        alpha = 0.2 if level < self.floor_db else 0.005
+        self.floor_db += alpha * (level - self.floor_db)
+
+        loud = level > max(self.floor_db + self.margin_db + self.extra_margin_db, self.min_dbfs)
+        if loud and not self.is_open and self.vad is not None:
+            loud = self.vad.predict(chunk) >= self.vad_threshold
+        if loud:
+            self.hold = self.hangover_chunks
+        elif self.hold > 0:
+            self.hold -= 1
+        self.is_open = loud or self.hold > 0
+        return self.is_open
+
+
+class ScoreSmoother:
+    """N-of-M score smoothing with per-model thresholds and a refractory period.
+
+    Keeps the last M frame scores for every model in a fixed ring and a running
+    count of frames above each model's threshold, updated per frame without
+    rescanning the window. A wake word fires once N of the last M frames are
+    above its threshold; after that all detections are held off for the
+    refractory period, counted in processed frames. Live listen windows start
+    on fresh audio and clear it, since no frames are processed in between.
+    """
+
+    def __init__(self, thresholds, config, frame_duration):
+        self.models = list(thresholds)
+        self.thresholds = np.array(list(thresholds.values()), dtype=np.float32)
+        self.window = max(1, config.get('window', 1))
+        self.min_hits = min(self.window, max(1, config.get('min_hits', 1)))
+        self.refractory_frames = int(config.get('refractory_ms', 0) / 1000 / frame_duration)
+        self.scores = np.zeros((self.window, len(self.models)), dtype=np.float32)
+        self.hits = np.zeros((self.window, len(self.models)), dtype=bool)
+        self.counts = np.zeros(len(self.models), dtype=np.int32)
+        self.index = 0
+        self.refractory = 0
+        self.fired_mean = 0.0  # mean window score of the last detection
+
+    def reset(self, refractory=False):
+        """Clear the score window; refractory=True also ends any refractory period"""
+        self.scores.fill(0)
+        self.hits.fill(False)
+        self.counts.fill(0)
+        if refractory:
+            self.refractory = 0
+
+    def update(self, prediction):
+        """Add one frame's scores; returns the model name if its wake word fired"""
+        row = self.scores[self.index]
+        for i, name in enumerate(self.models):
+            row[i] = prediction.get(name, 0.0)
+        hits = self.hits[self.index]
+        self.counts -= hits
+        np.greater(row, self.thresholds, out=hits)
+        self.counts += hits
+        self.index = (self.index + 1) % self.window
+
+        if self.refractory > 0:
+            self.refractory -= 1
+            return None
+        best = int(np.argmax(self.counts))
+        if self.counts[best] < self.min_hits:
+            return None
+        self.fired_mean = float(self.scores[:, best].mean())
+        self.reset()
+        self.refractory = self.refractory_frames
+        return self.models[best]
+
+    def advance(self, frames):
+        """Account for frames skipped by the energy gate as below threshold"""
+        for _ in range(min(frames, self.window)):
+            hits = self.hits[self.index]
+            self.counts -= hits
+            hits.fill(False)
+            self.scores[self.index].fill(0)
+            self.index = (self.index + 1) % self.window
+        self.refractory = max(0, self.refractory - frames)
+
+
+class EcoMode:
+    """Duty-cycles wake word inference while the room is quiet.
+
+    Eco mode starts after idle_after_s without sound getting through the energy
+    gate, or as soon as the gate closes during a scheduled window (e.g. overnight).
+    While on, the worker wakes once per batch_chunks chunks and runs the gate on
+    only the newest of them, which needs extra_margin_db more energy to open. A
+    chunk that opens the gate ends eco mode, and the whole batch plus the gate's
+    pre-roll goes through the models. Worker-thread CPU time is tracked per mode
+    to log the savings.
+    """
+
+    def __init__(self, config, chunk_duration):
+        self.enabled = config.get('enabled', False)
+        self.idle_chunks = int(config.get('idle_after_s', 300) / chunk_duration)
+        self.batch_chunks = max(1, config.get('batch_chunks', 4))
+        self.extra_margin_db = config.get('extra_margin_db', 6)
+        self.schedule = [self._parse_window(window) for window in config.get('schedule', [])]
+        self.active = False
+        self.idle = 0
+        self.cpu = {False: 0.0, True: 0.0}
+        self.wall = {False: 0.0, True: 0.0}
+        self.started_at = None
+        self._mark = None
+
+    @staticmethod
+    def _parse_window(window):
+        """'HH:MM-HH:MM' to (start, end) minutes after midnight"""
+        start, end = (datetime.strptime(t.strip(), '%H:%M') for t in window.split('-'))
+        return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+    def scheduled(self):
+        now = datetime.now()
+        minute = now.hour * 60 + now.minute
+        return any(
+            start <= minute < end if start <= end else (minute >= start or minute < end)
+            for start, end in self.schedule
+        )
+
+    def reset(self):
+        """Leave eco mode for a fresh listen window, e.g. right after a conversation"""
+        self._account()
+        if self.active:
+            self._switch(False)
+        self.idle = 0
+
+    def update(self, gate_open, chunks):
+        """Track gate activity after processing chunks; returns True while eco mode is on"""
+        if not self.enabled:
+            return False
+        self._account()
+        self.idle = 0 if gate_open else self.idle + chunks
+        if self.active and gate_open:
+            self._switch(False)
+        elif not self.active and not gate_open and (self.idle >= self.idle_chunks or self.scheduled()):
+            self._switch(True)
+        return self.active
+
+    def _account(self):
+        """Charge worker CPU and wall time since the last call to the current mode"""
+        mark = (time.thread_time(), time.monotonic())
+        if self._mark:
+            self.cpu[self.active] += mark[0] - self._mark[0]
+            self.wall[self.active] += mark[1] - self._mark[1]
+        self._mark = mark
+
+    def _switch(self, active):
+        self.active = active
+        if active:
+            self.started_at = time.monotonic()
+            logger.info("🌙 Eco mode on: gating every %d chunks, gate +%d dB", self.batch_chunks, self.extra_margin_db)
+            return
+        full = 100 * self.cpu[False] / self.wall[False] if self.wall[False] else 0.0
+        eco = 100 * self.cpu[True] / self.wall[True] if self.wall[True] else 0.0
+        logger.info(
+            "☀️  Eco mode off after %.0fs. Worker CPU %.2f%% in eco vs %.2f%% at full rate (%.0f%% less)",
+            time.monotonic() - self.started_at, eco, full, 100 * (1 - eco / full) if full else 0.0,
+        )
+
+
+class WakeWordVerifier:
+    """Second-stage check that re-scores the audio around a first-stage detection.
+
+    Runs only when the always-on detector fires. A separate model instance starts
+    from a clean state, scores the last window_ms of audio frame by frame, and
+    averages each frame over an ensemble: the wake word model plus any
+    languages.<lang>.verifier_models. The detection stands if the mean of the
+    top_frames ensemble scores clears threshold and, with vad_threshold > 0, the
+    Silero VAD hears speech in the window.
+    """
+
+    def __init__(self, config, languages, framework, sample_rate):
+        self.window = int(sample_rate * config.get('window_ms', 1500) / 1000) // MODEL_FRAME * MODEL_FRAME
+        self.threshold = config.get('threshold', 0.5)
+        self.top_frames = max(1, config.get('top_frames', 3))
+        self.vad_threshold = config.get('vad_threshold', 0.5)
+        self.vad = VAD() if self.vad_threshold > 0 else None
+        self.ensembles = {}
+        for lang in languages:
+            model = CONFIG['languages'][lang]['model']
+            self.ensembles[model] = [model] + list(CONFIG['languages'][lang].get('verifier_models', []))
+        names = sorted({name for ensemble in self.ensembles.values() for name in ensemble})
+        self.model = Model(
+            inference_framework=framework,
+            wakeword_models=[os.path.join(MODELS_PATH, f"{name}.{framework}") for name in names],
+        )
+        self.confirmed = 0
+        self.rejected = 0
+
+    def verify(self, reader, end, wake_word):
+        """Re-score the window ending at end; returns True if the detection stands"""
+        audio = reader.read(end - self.window, self.window) if end >= self.window else None
+        if audio is None:
+            logger.debug("🛡️  Not enough buffered audio to verify %s; accepting", wake_word)
+            self.confirmed += 1
+            return True
+
+        ensemble = self.ensembles.get(wake_word, [wake_word])
+        self.model.reset()
+        scores = np.empty(len(audio) // MODEL_FRAME, dtype=np.float32)
+        speech = 0.0
+        if self.vad:
+            self.vad.reset_states()
+        for i in range(len(scores)):
+            frame = audio[i * MODEL_FRAME:(i + 1) * MODEL_FRAME]
+            prediction = self.model.predict(frame)
+            scores[i] = np.mean([prediction.get(name, 0.0) for name in ensemble])
+            if self.vad:
+                speech = max(speech, self.vad.predict(frame))
+        scores.sort()
+        score = float(scores[-self.top_frames:].mean())
+
+        if score >= self.threshold and (not self.vad or speech >= self.vad_threshold):
+            self.confirmed += 1
+            logger.debug("🛡️  Verifier confirmed %s (score: %.2f, speech: %.2f)", wake_word, score, speech)
+            return True
+        self.rejected += 1
+        logger.info("🛡️  Verifier rejected %s (score: %.2f, speech: %.2f)", wake_word, score, speech)
+        return False
+
 
 class WakeWordDetector:
     """On-device wake word detection using OpenWakeWord"""
 
-    def __init__(self):
+    def __init__(self, languages, framework=None, verify=None):
         self.config = CONFIG['openwakeword']
-        self.audio_queue = queue.Queue()
-        self.framework = 'tflite' if IS_PI else 'onnx'
-        self.model_paths = []
-        for lang_config in CONFIG['languages'].values():
-            model_name = lang_config['model']
-            model_path = os.path.join(MODELS_PATH, f"{model_name}.{self.framework}")
-            self.model_paths.append(model_path)
+        verifier_config = self.config.get('verifier', {})
+        self.verify = verifier_config.get('enabled', False) if verify is None else verify
+        self.chunk_duration = self.config['chunk_duration_ms'] / 1000
+        self.languages = list(languages)
+        self.framework = framework or select_framework(self.languages)
+        self.scores = {}  # highest score per model from the last processed chunk
+        self.fired_end = None  # reader position just after the model frame that fired
 
-        # Download required models once if needed
-        openwakeword.utils.download_models()
+        # The model and smoother are only ever touched from the inference worker thread after this
+        self.model = self._load_model(self.languages)
+        self.smoother = self._smoother(self.languages)
+        self.verifier = self._verifier(self.languages)
+        self.gate = EnergyGate(
+            self.config.get('energy_gate', {}),
+            self.chunk_duration,
+            int(self.config['sample_rate'] * self.chunk_duration),
+        )
+        self.eco = EcoMode(self.config.get('eco', {}), self.chunk_duration)
+        queue_config = self.config.get('queue', {})
+        self.audio_queue = FrameQueue(queue_config.get('max_frames', 8), queue_config.get('overflow', 'drop_oldest'))
+        self.stats = None
+        self._dropped_reported = 0
+        self._dropped_logged_at = 0.0
+        self.worker = threading.Thread(target=self._inference_loop, name="wakeword-inference", daemon=True)
+        self.worker.start()
+        AUDIO.pace(self._caught_up, input_only=True)
 
-        self.model = Model(
+    def _caught_up(self):
+        """Virtual clocks wait on this so replayed audio isn't dropped by a slow worker"""
+        return self.audio_queue.idle() or not self.worker.is_alive()
+
+    def _load_model(self, languages):
+        """Build a model holding only the wake words for the given languages"""
+        ensure_models(self.framework, languages)
+        model_paths = [
+            os.path.join(MODELS_PATH, f"{CONFIG['languages'][lang]['model']}.{self.framework}")
+            for lang in languages
+        ]
+        logger.info("📦 Loading wake word models: %s", ', '.join(CONFIG['languages'][lang]['model'] for lang in languages))
+        return Model(
             inference_framework=self.framework,
-            wakeword_models=self.model_paths,
+            wakeword_models=model_paths,
             vad_threshold=self.config['vad_threshold'],
         )
 
-    async def listen(self):
-        """Listen for wake word and return detected wake word"""
+    def _smoother(self, languages):
+        """Score smoother with each language's threshold, falling back to the global one"""
+        thresholds = {
+            CONFIG['languages'][lang]['model']: CONFIG['languages'][lang].get('threshold', self.config['threshold'])
+            for lang in languages
+        }
+        return ScoreSmoother(thresholds, self.config.get('smoothing', {}), MODEL_FRAME / self.config['sample_rate'])
+
+    def _verifier(self, languages):
+        if not self.verify:
+            return None
+        return WakeWordVerifier(self.config.get('verifier', {}), languages, self.framework, self.config['sample_rate'])
+
+    def set_languages(self, languages):
+        """Swap the loaded wake word models, e.g. when the active profile changes"""
+        languages = list(languages)
+        if languages != self.languages:
+            self.languages = languages
+            self.audio_queue.put_control((_LOAD, languages))
 
-        # Reset prediction/audio buffers and start with fresh audio queue
+    def add_language(self, lang):
+        """Start listening for another language's wake word"""
+        if lang not in self.languages:
+            self.set_languages(self.languages + [lang])
+
+    def remove_language(self, lang):
+        """Stop listening for a language's wake word"""
+        self.set_languages([language for language in self.languages if language != lang])
+
+    def _inference_loop(self):
+        """Run wake word inference on captured frames and post detections back to the event loop"""
+        loop = detection = None
+        while True:
+            item = self.audio_queue.get()
+            if item[0] is _STOP:
+                break
+            if item[0] is _LOAD:
+                try:
+                    self.model = self._load_model(item[1])
+                    self.smoother = self._smoother(item[1])
+                    self.verifier = self._verifier(item[1])
+                except Exception as e:
+                    logger.error("❌ Failed to load wake word models: %s", e)
+                continue
+            if item[0] is _ARM:
+                _, loop, detection = item
+            elif detection is None or detection.done():
+                continue  # Not listening; drain stale frames
+            try:
+                if item[0] is _ARM:
+                    self.reset(refractory=True)
+                    self.eco.reset()
+                    self._set_eco(False)
+                    continue
+                batch = [item]
+                if self.audio_queue.policy == 'catch_up' or self.eco.active:
+                    batch += self.audio_queue.drain_frames()
+                self._report_drops()
+
+                # Process runs of consecutive frames from the same subscription together
+                while batch:
+                    subscription, pos, frames, _, _ = batch[0]
+                    count = 1
+                    while (count < len(batch) and batch[count][0] is subscription
+                           and batch[count][1] == pos + count * frames):
+                        count += 1
+                    for _, _, _, queued_at, _ in batch[:count]:
+                        self.stats.record_lag(time.monotonic() - queued_at)
+                    run, batch = batch[:count], batch[count:]
+                    stride = self.eco.batch_chunks if self.eco.active else 1
+                    wake_word = self.process(subscription, pos, frames, count, gate_stride=stride)
+                    self._set_eco(self.eco.update(self.gate.is_open, count))
+                    if wake_word:
+                        # Hand the session audio from the chunk that fired, not the end of the run
+                        fired = min(max(self.fired_end - pos - 1, 0) // frames, count - 1)
+                        _, _, _, captured_at, bus_pos = run[fired]
+                        loop.call_soon_threadsafe(self._resolve, detection, wake_word, captured_at, bus_pos)
+                        detection = None
+                        break
+            except Exception as e:
+                # Surface the error in listen() instead of leaving it waiting on a dead worker
+                logger.error("❌ Wake word inference error: %s", e)
+                loop.call_soon_threadsafe(self._fail, detection, e)
+                detection = None
+
+    def _set_eco(self, active):
+        """Apply eco mode to the gate margin and the worker's wake-up cadence"""
+        self.gate.extra_margin_db = self.eco.extra_margin_db if active else 0
+        self.audio_queue.wake_frames = min(self.eco.batch_chunks, self.audio_queue.max_frames) if active else 1
+
+    def _report_drops(self):
+        """Log newly dropped frames, at most once per DROP_LOG_INTERVAL"""
+        dropped = self.audio_queue.dropped
+        now = time.monotonic()
+        if dropped > self._dropped_reported and now - self._dropped_logged_at >= DROP_LOG_INTERVAL:
+            logger.warning(
+                "⚠️  Wake word queue dropped %d frames (%d total of %d, max depth %d/%d)",
+                dropped - self._dropped_reported, dropped, self.audio_queue.enqueued,
+                self.audio_queue.max_depth, self.audio_queue.max_frames,
+            )
+            self._dropped_reported = dropped
+            self._dropped_logged_at = now
+
+    def metrics(self):
+        """Cumulative capture queue counters for monitoring"""
+        return {
+            'enqueued': self.audio_queue.enqueued,
+            'dropped': self.audio_queue.dropped,
+            'depth': self.audio_queue.depth(),
+            'max_depth': self.audio_queue.max_depth,
+            'max_frames': self.audio_queue.max_frames,
+            'policy': self.audio_queue.policy,
+        }
+
+    def reset(self, refractory=False):
+        """Reset prediction/audio buffers for a fresh listen window"""
         self.model.reset()
-        self.audio_queue = queue.Queue()
+        self.gate.reset()
+        self.smoother.reset(refractory)
+
+    def process(self, reader, pos, frames, count=1, gate_stride=1):
+        """Run captured chunks through the gate and models; returns the wake word if it fired.
+
+        reader is anything with read(pos, frames), i.e. a capture subscription or ring
+        buffer. count > 1 processes a backlog of consecutive chunks starting at pos.
+        gate_stride > 1 only gates every gate_stride-th chunk, counting back from the newest.
+        When a wake word fires, fired_end is the reader position where its model frame ends.
+        """
+        self.scores = {}
+        was_open = self.gate.is_open
+        is_open = False
+        for i in reversed(range(count - 1, -1, -gate_stride)):
+            chunk = reader.read(pos + i * frames, frames)  # zero-copy view
+            if chunk is None:
+                logger.warning("⚠️  Capture ring overran, dropping frame")
+                return None
+            is_open = self.gate.update(chunk) or is_open
+        if not is_open:
+            self.smoother.advance(count * frames // MODEL_FRAME)
+            return None  # Clearly silence; skip the models
+
+        # Replay recent history when the gate opens so onsets aren't clipped
+        start = pos
+        if not was_open:
+            for _ in range(self.gate.preroll_chunks):
+                if reader.read(start - frames, frames) is None:
+                    break
+                start -= frames
+        end = pos + count * frames
+        predictions = self._predict(reader.read(start, end - start))
+        for i, prediction in enumerate(predictions):
+            if wake_word := self._check(prediction):
+                # Predictions are one per model frame, the last ending at end
+                fired_end = end - (len(predictions) - 1 - i) * MODEL_FRAME
+                if self.verifier and not self.verifier.verify(reader, fired_end, wake_word):
+                    continue
+                self.fired_end = fired_end
+                return wake_word
+        return None
+
+    def _predict(self, audio):
+        """Run the models on audio; returns one prediction per 80ms model frame"""
+        started = time.perf_counter()
+        if len(audio) > MODEL_FRAME and all(n == 1 for n in self.model.model_outputs.values()):
+            predictions = self._predict_frames(audio)
+        else:
+            predictions = [self.model.predict(audio)]
+        self.stats.record_inference(time.perf_counter() - started, self.audio_queue.depth())
+        return predictions
+
+    def _predict_frames(self, audio):
+        """Batched inference over several model frames with per-frame scores.
+
+        Model.predict on a multi-frame buffer only returns the max score over the
+        window. Here the melspectrogram runs once over the whole buffer and each
+        wake word head is scored per frame, with the prediction buffer and VAD
+        gating updated the same way Model.predict does for a single frame.
+        """
+        model = self.model
+        n_frames = model.preprocessor(audio) // MODEL_FRAME
+        predictions = []
+        for i in range(n_frames - 1, -1, -1):  # oldest frame first
+            prediction = {}
+            for mdl in model.models:
+                n_inputs = model.model_inputs[mdl]
+                features = model.preprocessor.get_features(n_inputs, start_ndx=-n_inputs - i)
+                score = model.model_prediction_function[mdl](features)[0][0][0]
+                # Match Model.predict: ignore the first frames while the feature buffer fills
+                if len(model.prediction_buffer[mdl]) < 5:
+                    score = 0.0
+                prediction[mdl] = score
+
+            if model.vad_threshold > 0:
+                end = len(audio) - i * MODEL_FRAME
+                model.vad(audio[end - MODEL_FRAME:end])
+                vad_frames = list(model.vad.prediction_buffer)[-7:-4]
+                if (np.max(vad_frames) if vad_frames else 0) < model.vad_threshold:
+                    prediction = {mdl: 0.0 for mdl in prediction}
+
+            for mdl, score in prediction.items():
+                model.prediction_buffer[mdl].append(score)
+            predictions.append(prediction)
+        return predictions
+
+    def _check(self, prediction):
+        """Smooth one frame's scores against the thresholds; returns the wake word if it fired"""
+        for name, score in prediction.items():
+            self.scores[name] = max(score, self.scores.get(name, 0.0))
+
+        if wake_word := self.smoother.update(prediction):
+            logger.info("⏰ Wake word activated: %s (score: %.2f, window mean: %.2f)",
+                        wake_word, prediction.get(wake_word, 0.0), self.smoother.fired_mean)
+            logger.debug("Prediction items: %s", prediction.items())
+            return wake_word
+        name, score = max(prediction.items(), key=lambda x: x[1])
+        if score > 0.01:
+            logger.debug("🔍 Wake word detected: %s (score: %.2f)", name, score)
+        return None
+
+    @staticmethod
+    def _resolve(detection, wake_word, captured_at, bus_pos):
+        if not detection.done():
+            detection.set_result((wake_word, captured_at, bus_pos))
+
+    @staticmethod
+    def _fail(detection, error):
+        if not detection.done():
+            detection.set_exception(error)
+
+    async def listen(self):
+        """Listen for wake word and return detected wake word"""
+        loop = asyncio.get_running_loop()
+        detection = loop.create_future()
+        self.stats = ListenStats(self.chunk_duration, self.audio_queue)
+        self.audio_queue.put_control((_ARM, loop, detection))
         logger.info("🎙️  Listening for wake word using %s model...", self.framework.upper())
 
+        subscription = None
         try:
-            blocksize = int(self.config['sample_rate'] * self.config['chunk_duration_ms'] / 1000)
+            blocksize = int(self.config['sample_rate'] * self.chunk_duration)
 
-            def audio_callback(indata, _frames, _time, status):
-                if status:
-                    logger.warning("⚠️  Audio device status: %s", status)
-                try:
-                    self.audio_queue.put_nowait(indata)
-                except queue.Full:
-                    # Drop frame if queue falls behind
-                    logger.warning("⚠️  Audio queue full, dropping frame")
-                    pass
-
-            AUDIO.start_recording(
-                sample_rate=self.config['sample_rate'],
-                dtype='int16',
-                blocksize=blocksize,
-                callback=audio_callback,
-                input_gain=self.config['input_gain']
-            )
+            def audio_callback(source, pos, frames):
+                # Bus position right after this block, for handing post-wake-word audio to the session
+                bus_pos = AUDIO.capture_ring.write_pos
+                self.audio_queue.put_frame((source, pos, frames, time.monotonic(), bus_pos))
 
-            while True:
-                # Poll queue with timeout to yield control
-                try:
-                    chunk = self.audio_queue.get(timeout=0.01)
-                    chunk_flat = chunk[:, 0].flatten() # mono channel
-                    prediction = self.model.predict(chunk_flat)
-                    wake_word, score = max(prediction.items(), key=lambda x: x[1])
-                    if score > self.config['threshold']:
-                        logger.info("⏰ Wake word activated: %s (score: %.2f)", wake_word, score)
-                        logger.debug("Prediction items: %s", prediction.items())
-                        AUDIO.stop_recording()
-                        return wake_word
-                    elif score > 0.01:
-                        logger.debug("🔍 Wake word detected: %s (score: %.2f)", wake_word, score)
-                except queue.Empty:
-                    await asyncio.sleep(0.01)  # Yield to event loop
+            subscription = AUDIO.subscribe(self.config['sample_rate'], blocksize, audio_callback)
+
+            wake_word, captured_at, bus_pos = await detection
+            AUDIO.unsubscribe(subscription)
+            AUDIO.mark_preroll(bus_pos)
+            self.stats.log(wake_latency=time.monotonic() - captured_at)
+            return wake_word
+        except asyncio.CancelledError:
+            self.stats.log()
+            raise
         except Exception as e:
             logger.error("❌ Audio input error: %s", e)
             raise
         finally:
-            AUDIO.stop_recording()
+            if subscription:
+                AUDIO.unsubscribe(subscription)
+            detection.cancel()
+
+    def close(self):
+        """Stop the inference worker"""
+        self.audio_queue.put_control((_STOP,))
+        self.worker.join(timeout=1)